@@ -1,211 +1,198 @@
-import os
-import re
-import time
-import json
-import requests
-import pygame
+import threading
 import customtkinter as ctk
 from customtkinter import *
 from tkinter import messagebox
-from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler
-from datetime import datetime, timezone
 from PIL import Image
-
-# Constants
-CONFIG_FILE = "config.json"
+from yo7core import config_exists, load_config, metrics, notify, save_config, set_error_handler
+from yo7core.events import drain_events, post_error, post_event
+from yo7core.rules import rule_text, split_rule_text
+from yo7core.watcher import Scanner
 
 
 # Global variables
 prefs_ready = False  
-scanning = False
-observer = None
-start_timestamp = None
-latest_log = None
-last_toast_time = 0
-
-
-# error box
+scanner = Scanner()
+# set while the scanner is starting or stopping on its helper thread
+scanner_busy = False
+status_clear = None
+# live feed, only FEED_ROWS labels ever exist and they are rewritten in place
+FEED_ROWS = 10
+FEED_WIDTH = 78
+CHANNEL_COLOURS = {"DM": "#E8B04A", "LOCAL": "#C8C8C8", "SYSTEM": "#7FA7D9", "WING": "#5BC0DE",
+                   "SQUAD": "#2FA572", "VC": "#C58AE0"}
+feed_first = 0
+feed_follow = True
+feed_cache = (None, [])
+feed_shown = None
+feed_anchor = None
+
+
+# error box, only for mistakes made in the preferences window
 def error(e):
     messagebox.showerror("Error!", e)
 
 
-# function for reading save file
-def load_config():
-    if os.path.exists(CONFIG_FILE):
-        try:
-            with open(CONFIG_FILE, "r") as pullfile:
-                return json.load(pullfile)
-        except FileNotFoundError:
-            error("config.json file doesnt exist")
-        except json.JSONDecodeError:
-            error("file format issuer \n(json decode error)")
-    else:
-        error("config file doesnt exist")
-    
+# errors from the core threads come in through the event queue and show under the buttons
+set_error_handler(post_error)
+
 
 # Checks if settings exist
-if os.path.exists(CONFIG_FILE):
+if config_exists():
     prefs_ready = True
 else:
     prefs_ready = False
 
 
-# Save settings function
-def save_config(config):
-    with open(CONFIG_FILE, "w") as savefile:
-        json.dump(config, savefile, indent=4)
-
-
-def find_latest_log():
-    config_pull = load_config()
-    folder_path = config_pull.get("logfile_name")
-    logs = [log for log in os.listdir(folder_path) if re.match(r'(?i)journal\.\d{4}-\d{2}-\d{2}T\d{6}\.01\.log', log)]
-    if logs:
-        latest_log = max(logs, key=lambda log: re.search(r'\d{4}-\d{2}-\d{2}T\d{6}', log).group())
-        return os.path.join(config_pull.get("logfile_name"), latest_log)
-    
-
 def scan_pressed():
-    global scanning
-    if prefs_ready == True and scanning == False:
+    if scanner_busy:
+        return
+    if prefs_ready == True and not scanner.scanning:
         start_scanning()
-        start_monitoring()
-    elif scanning == True:
+    elif scanner.scanning:
         stop_scanning()
     else:
-        error("You haven't set the log file location, \nor there is an issue with the log location")  
+        show_status("You haven't set the log file location, \nor there is an issue with the log location")  
+
+
+# starting and stopping can take a moment (joining threads, in flight webhooks), so it happens
+# on a helper thread and the window only hears about it once its done
+def run_in_background(task, done_event):
+    global scanner_busy
+    scanner_busy = True
+    scan_button.configure(state="disabled")
+
+    def work():
+        try:
+            task()
+        except Exception as e:
+            post_error(e)
+        post_event(done_event)
+
+    threading.Thread(target=work, name="Yo7 " + done_event, daemon=True).start()
 
 
 def start_scanning():
-    global scanning, start_timestamp
-    scanning = True
-    start_timestamp = datetime.now(timezone.utc).isoformat()
-    scan_label.configure(text="scanning")
-    scan_button.configure(text="stop scanning", hover_color="#BB0000")
+    scan_label.configure(text="starting...")
+    show_status("")
+    run_in_background(scanner.start, "started")
 
 
 def stop_scanning():
-    global scanning, observer
-    scanning = False
-    if observer:
-        observer.stop()
-        observer.join()
-    scan_label.configure(text="scanner inactive")
-    scan_button.configure(text="start scanning", hover_color="#106A43")
-
-
-def send_discord(payload):
-    config_pull = load_config()
-    webhook = config_pull.get("webhook_url")
-    try:
-        response = requests.post(webhook, json=payload)
-        response.raise_for_status()
-        time.sleep(1)
-    except requests.exceptions.HTTPError as e:
-        error(e)
-    except requests.exceptions.RequestException as e:
-        error(e)
-
-
-def send_alert():
-    pygame.init()
-    pygame.mixer.init(frequency=44100, size=-16, channels=1, buffer=512)
-    sound = "Yo7.wav"
-    config_pull = load_config()
-    pull_vol = config_pull.get("volume")
-    push_vol = round(float(pull_vol)/100,1)
-    my_sound = pygame.mixer.Sound(sound)
-    try:
-        my_sound.set_volume(push_vol)
-        my_sound.play()
-    except Exception as e:
-        error(e)
-    time.sleep(1)
-    pygame.mixer.quit()
-    pygame.quit() 
-    
-
-class LogWatcher(FileSystemEventHandler):
-    def __init__(self):
-        self.config_pull = load_config()
-        self.folder = self.config_pull.get("logfile_name")
-        self.latest_log = find_latest_log()
-        self.set_latest_log(self.latest_log)
-        self.last_position = 0
-        self.process_new_lines()  
-
-    def on_modified(self, event):
-        if event.src_path == self.latest_log:
-            time.sleep(0.5)
-            self.process_new_lines()
-    
-    def on_created(self, event):
-        if event.src_path.startswith(self.folder):
-            time.sleep(0.5)
-            new_file= find_latest_log()
-            if new_file != self.latest_log:
-                self.latest_log = new_file
-                self.set_latest_log(self.latest_log)
-                self.last_position = 0
-                self.process_new_lines()
-
-    def set_latest_log(self, log_file):
-        self.latest_log = log_file
-
-    def process_new_lines(self):
-        global scanning
-        if not self.latest_log or not os.path.exists(self.latest_log) or not scanning:
+    if not scanner.scanning or scanner_busy:
+        return
+    scan_label.configure(text="stopping...")
+    run_in_background(scanner.stop, "stopped")
+
+
+def show_scanner_state():
+    global scanner_busy
+    scanner_busy = False
+    scan_button.configure(state="normal")
+    if scanner.scanning:
+        accounts = len(scanner.watchers)
+        scan_label.configure(text="scanning" if accounts == 1 else f"scanning {accounts} accounts")
+        scan_button.configure(text="stop scanning", hover_color="#BB0000")
+    else:
+        scan_label.configure(text="scanner inactive")
+        scan_button.configure(text="start scanning", hover_color="#106A43")
+
+
+# non modal error line, clears itself after a while
+def show_status(text):
+    global status_clear
+    status_label.configure(text=text)
+    if status_clear is not None:
+        root.after_cancel(status_clear)
+        status_clear = None
+    if text:
+        status_clear = root.after(10000, show_status, "")
+
+
+# picks up whatever the core threads posted since the last tick
+def poll_events():
+    for kind, data in drain_events():
+        if kind == "error":
+            show_status(str(data))
+        elif kind in ("started", "stopped"):
+            show_scanner_state()
+        elif kind == "closed":
+            root.destroy()
             return
-        with open(self.latest_log, "r", encoding="utf-8") as current:
-            current.seek(self.last_position)
-            new_lines = current.readlines()
-            self.last_position = current.tell()
-            for line in new_lines:
-                match = re.search(r'\{.*\}', line)
-                if match:
-                    log = json.loads(match.group())
-                    timestamp = log.get("timestamp")
-                    if timestamp and start_timestamp and timestamp > start_timestamp:
-                        event = log.get("event")
-                        if event in ("Receivetext", "ReceiveText"):
-                            channel = log.get("Channel","Unknown")
-                            from_cmdr = log.get("From","Unknown")
-                            message = log.get("Message","Unknown")
-                            channel_swap = {"player": "DM", "starsystem": "SYSTEM", "local": "LOCAL",
-                                            "wing": "WING", "voicechat": "VC", "squadron": "SQUAD"}
-                            if from_cmdr.startswith("$") or message.startswith("$"):
-                                continue
-                            if channel in channel_swap.keys():
-                                channel_name = channel_swap[channel]
-                            else:
-                                channel_name = "Unknown"
-                            payload = {"username": "Yo7", "content": f"`{channel_name}`   {from_cmdr} :   {message}"}
-                            saved_status = load_config()
-                            notify_meth = saved_status.get("notif_type")
-                            status = saved_status.get(channel_name)
-                    
-                            if status == "on" and notify_meth == "simple sound alert":
-                                #simple sound alert action
-                                send_alert()
-                            elif status == "on" and notify_meth == "discord notification":
-                                #discord alert action
-                                send_discord(payload)
-                            else:
-                                continue
-
-
-def start_monitoring():
-    global observer 
-    if observer:
-        observer.stop()
-        observer.join()
-    config_pull = load_config()
-    path = config_pull.get("logfile_name")
-    event_handler = LogWatcher()
-    observer = Observer()
-    observer.schedule(event_handler, path=path, recursive=False)
-    observer.start()
+    # however many messages came in since the last tick, the feed redraws once
+    render_feed()
+    root.after(100, poll_events)
+
+
+# the buffered messages that pass the feed filter, only worked out again when either changed
+def feed_lines():
+    global feed_cache
+    feed = scanner.feed
+    channel = feed_filter.get()
+    if feed_cache[0] != (feed, feed.version, channel):
+        version, lines = feed.snapshot()
+        if channel != "all channels":
+            lines = [line for line in lines if line[1] == channel]
+        feed_cache = ((feed, version, channel), lines)
+    return feed_cache
+
+
+def render_feed():
+    global feed_first, feed_shown, feed_anchor
+    key, lines = feed_lines()
+    total = len(lines)
+    last_first = max(total - FEED_ROWS, 0)
+    if feed_follow:
+        feed_first = last_first
+    elif feed_shown is not None and feed_shown[0] != key and feed_anchor is not None:
+        # old messages dropped out of the buffer, keep the same message at the top while scrolled back
+        try:
+            feed_first = lines.index(feed_anchor)
+        except ValueError:
+            feed_first = 0
+    feed_first = min(max(feed_first, 0), last_first)
+    if (key, feed_first) == feed_shown:
+        return
+    feed_shown = (key, feed_first)
+    feed_anchor = lines[feed_first] if total else None
+    for row, label in enumerate(feed_rows):
+        index = feed_first + row
+        if index < total:
+            timestamp, channel_name, sender, message, account = lines[index]
+            who = sender if account == "main" else f"{sender} ({account})"
+            text = f"{timestamp[11:19]}  {channel_name:<6} {who}: {message}"
+            if len(text) > FEED_WIDTH:
+                text = text[:FEED_WIDTH - 3] + "..."
+            label.configure(text=text, text_color=CHANNEL_COLOURS.get(channel_name, "#AAAAAA"))
+        else:
+            label.configure(text="")
+    if total:
+        feed_scrollbar.set(feed_first / total, min((feed_first + FEED_ROWS) / total, 1))
+    else:
+        feed_scrollbar.set(0, 1)
+
+
+# scrollbar and mouse wheel, scrolling back to the bottom picks up following new messages again
+def feed_scrolled(action, amount, unit="units"):
+    global feed_first, feed_follow
+    total = len(feed_lines()[1])
+    last_first = max(total - FEED_ROWS, 0)
+    if action == "moveto":
+        feed_first = int(float(amount) * total)
+    else:
+        feed_first += int(amount) * (FEED_ROWS if unit == "pages" else 1)
+    feed_first = min(max(feed_first, 0), last_first)
+    feed_follow = feed_first >= last_first
+    render_feed()
+
+
+def feed_wheel(event):
+    feed_scrolled("scroll", -int(event.delta/40))
+
+
+def feed_filtered(choice):
+    global feed_follow
+    feed_follow = True
+    render_feed()
 
 
 # GUI initial setup
@@ -218,7 +205,7 @@ def pref_window():
     stop_scanning()
     pref = ctk.CTkToplevel()
     pref.grab_set()
-    pref.geometry("500x550")
+    pref.geometry("500x720")
     pref.title("Preferences")
     pref.after(200, lambda: pref.iconbitmap("Yo7.ico"))
     pref.resizable(False, False)
@@ -303,6 +290,12 @@ def pref_window():
             volume_label.configure(text_color=disable_color)
             volume_slider.configure(button_color=(disable_color,disable_color), progress_color=(disable_color,disable_color), 
                                     state="disabled", hover=False)
+        elif choice_sel == "sound and discord":
+            # enable both
+            discord_entry.configure(state="normal", text_color="#DCE4EE" , placeholder_text_color="gray52")
+            discord_button.configure(state="normal", fg_color="#2FA572")
+            volume_label.configure(text_color="#AAAAAA")
+            volume_slider.configure(button_color=("#2CC985","#2FA572"), progress_color=("gray40","#AAB0B5"), state="normal", hover=True)
         else:
             # # disable discord if not saved
             # # if webhook.startswith("http"):
@@ -321,7 +314,7 @@ def pref_window():
     choice_label= ctk.CTkLabel(master=pref, text="Which kind of notification", text_color="#AAAAAA" , font=("Roboto", 15))
     choice_label.grid(row=1, column=0, sticky="e", padx=(20,5), pady=(15,0))
 
-    choice_box = ctk.CTkOptionMenu(master=pref, values=["simple sound alert", "discord notification"], 
+    choice_box = ctk.CTkOptionMenu(master=pref, values=["simple sound alert", "discord notification", "sound and discord"], 
                                    text_color="Black", font=("Roboto", 15), width=220, height=30, command=choice_func)
     choice_box.grid(row=1, column=1, sticky="e", padx=(10,20), pady=(15,0))
 
@@ -348,7 +341,7 @@ def pref_window():
     def discord_test():
         webhook = discord_entry.get()
         test_message = {"username": "Yo7", "content": f"`TEST` seems to be working"}
-        requests.post(webhook, json=test_message)
+        notify.discord.send(webhook, test_message)
         
 
     discord_button = ctk.CTkButton(master=pref, text="test webhook", font=("Roboto", 15), text_color="Black", 
@@ -356,6 +349,15 @@ def pref_window():
     discord_button.grid(row=3, column=1, sticky="ne", padx=(10,20), pady=(15,0))
 
 
+    # catch up on messages that came in while the scanner was stopped
+    catchup_label= ctk.CTkLabel(master=pref, text="Catch up on messages missed while stopped", text_color="#AAAAAA" , font=("Roboto", 15))
+    catchup_label.grid(row=4, column=0, sticky="e", padx=(20,5), pady=(15,0))
+
+    catchup_choice = ctk.StringVar(value="off")
+    catchup_switch= ctk.CTkSwitch(master=pref, text=None , onvalue="on", offvalue="off", variable=catchup_choice)
+    catchup_switch.grid(row=4, column=1, sticky="nw", padx=(10,5) , pady=(20,0))
+
+
     # edchannel options
     choice_label= ctk.CTkLabel(master=pref, text="Choose which channels to receive notifications from:", justify="center" , text_color="#AAAAAA" , font=("Roboto", 15))
     choice_label.grid(row=5, column=0 , columnspan=2, sticky="nwe", padx=(20,20), pady=(20,0))
@@ -409,9 +411,28 @@ def pref_window():
     vc_switch= ctk.CTkSwitch(master=pref, text=None , onvalue="on", offvalue="off", variable=vc_choice)
     vc_switch.grid(row=11, column=1, sticky="nw", padx=(10,5) , pady=(10,0))
 
+    # filter rules, comma separated. leave them empty to hear every message on the channels above
+    keyword_label= ctk.CTkLabel(master=pref, text="Only alert on words", text_color="#AAAAAA" , font=("Roboto", 15))
+    keyword_label.grid(row=12, column=0, sticky="e", padx=(20,5), pady=(15,0))
+
+    keyword_entry= ctk.CTkEntry(master=pref, placeholder_text="o7, help, /regex/", font=("Roboto", 15), width=220, height=30)
+    keyword_entry.grid(row=12, column=1, sticky="e", padx=(10,20), pady=(15,0))
+
+    cmdr_label= ctk.CTkLabel(master=pref, text="Always alert for cmdrs", text_color="#AAAAAA" , font=("Roboto", 15))
+    cmdr_label.grid(row=13, column=0, sticky="e", padx=(20,5), pady=(10,0))
+
+    cmdr_entry= ctk.CTkEntry(master=pref, placeholder_text="cmdr names", font=("Roboto", 15), width=220, height=30)
+    cmdr_entry.grid(row=13, column=1, sticky="e", padx=(10,20), pady=(10,0))
+
+    mute_label= ctk.CTkLabel(master=pref, text="Mute cmdrs", text_color="#AAAAAA" , font=("Roboto", 15))
+    mute_label.grid(row=14, column=0, sticky="e", padx=(20,5), pady=(10,0))
+
+    mute_entry= ctk.CTkEntry(master=pref, placeholder_text="cmdr names", font=("Roboto", 15), width=220, height=30)
+    mute_entry.grid(row=14, column=1, sticky="e", padx=(10,20), pady=(10,0))
+
 
     #lets the the choice fuction disable based on default value
-    if os.path.exists(CONFIG_FILE):
+    if config_exists():
         config_pull = load_config()
         choice = config_pull.get("notif_type")
         choice_func(choice)
@@ -427,6 +448,14 @@ def pref_window():
         wing_choice.set(config_pull.get("WING"))
         squad_choice.set(config_pull.get("SQUAD"))
         vc_choice.set(config_pull.get("VC"))
+        catchup_choice.set(config_pull.get("catch_up", "off"))
+        rules = config_pull.get("rules") or {}
+        if rules.get("keywords") or rules.get("patterns"):
+            keyword_entry.insert(0, rule_text(rules.get("keywords", ()), rules.get("patterns", ())))
+        if rules.get("commanders"):
+            cmdr_entry.insert(0, ", ".join(rules["commanders"]))
+        if rules.get("blocked"):
+            mute_entry.insert(0, ", ".join(rules["blocked"]))
     else:
         choice_func("simple sound alert")
     
@@ -436,16 +465,24 @@ def pref_window():
         global prefs_ready
         test_log = log_entry.get()
         if test_log.startswith("C:"):
-            save = {"logfile_name" : log_entry.get(), 
-                    "notif_type" : choice_box.get(),
-                    "volume" : int(volume_slider.get()),
-                    "webhook_url" : discord_entry.get(),
-                    "DM" : dm_choice.get(),
-                    "LOCAL" : local_choice.get(),
-                    "SYSTEM" : system_choice.get(),
-                    "WING" : wing_choice.get(),
-                    "SQUAD" : squad_choice.get(),
-                    "VC" : vc_choice.get()}
+            # keep anything the window doesnt edit, like extra accounts and metrics settings
+            save = dict(load_config() or {}) if config_exists() else {}
+            save.update({"logfile_name" : log_entry.get(), 
+                         "notif_type" : choice_box.get(),
+                         "volume" : int(volume_slider.get()),
+                         "webhook_url" : discord_entry.get(),
+                         "DM" : dm_choice.get(),
+                         "LOCAL" : local_choice.get(),
+                         "SYSTEM" : system_choice.get(),
+                         "WING" : wing_choice.get(),
+                         "SQUAD" : squad_choice.get(),
+                         "VC" : vc_choice.get(),
+                         "catch_up" : catchup_choice.get()})
+            keywords, patterns = split_rule_text(keyword_entry.get())
+            save["rules"] = {"keywords" : keywords,
+                             "patterns" : patterns,
+                             "commanders" : split_rule_text(cmdr_entry.get())[0],
+                             "blocked" : split_rule_text(mute_entry.get())[0]}
             save_config(save)
             prefs_ready = True
             pref.destroy()
@@ -453,12 +490,12 @@ def pref_window():
             error("You need to set the log file before saving!\nIt should start with drive C:")
         
     save_button = ctk.CTkButton(master=pref, text="save settings", font=("Roboto", 15), text_color="Black", height=30, command=save_settings)
-    save_button.grid(row=12, column=0, columnspan=2 , sticky="sew", padx=(20,20), pady=(15,20))
+    save_button.grid(row=15, column=0, columnspan=2 , sticky="sew", padx=(20,20), pady=(15,20))
 
 
 #Defining the main window
 root = ctk.CTk()
-root.geometry("300x110")
+root.geometry("520x380")
 root.title("Yo7")
 root.iconbitmap("Yo7.ico")
 root.resizable(False, False)
@@ -467,6 +504,31 @@ root.resizable(False, False)
 #Denfining main window elements
 scan_label = ctk.CTkLabel(master=root, text="scanner inactive", font=("Roboto", 18)) 
 scan_label.pack( pady = (20,10))
+
+status_label = ctk.CTkLabel(master=root, text="", text_color="#D05050", font=("Roboto", 12), height=20, wraplength=500)
+status_label.pack( side = "bottom", pady = (0,5))
+
+# live chat feed
+feed_frame = ctk.CTkFrame(master=root)
+feed_frame.pack( side = "bottom", fill = "x", padx = 10, pady = (10,0))
+
+feed_label = ctk.CTkLabel(master=feed_frame, text="Live chat", text_color="#AAAAAA", font=("Roboto", 13))
+feed_label.grid(row=0, column=0, sticky="w", padx=(10,5), pady=(5,0))
+
+feed_filter = ctk.CTkOptionMenu(master=feed_frame, values=["all channels", "DM", "LOCAL", "SYSTEM", "WING", "SQUAD", "VC"],
+                                text_color="Black", font=("Roboto", 12), width=120, height=24, command=feed_filtered)
+feed_filter.grid(row=0, column=0, columnspan=2, sticky="e", padx=(5,10), pady=(5,0))
+
+feed_rows = []
+for feed_row in range(FEED_ROWS):
+    row_label = ctk.CTkLabel(master=feed_frame, text="", anchor="w", justify="left", font=("Consolas", 11), height=18, width=470)
+    row_label.grid(row=feed_row + 1, column=0, sticky="w", padx=(10,0))
+    row_label.bind("<MouseWheel>", feed_wheel)
+    feed_rows.append(row_label)
+feed_frame.bind("<MouseWheel>", feed_wheel)
+
+feed_scrollbar = ctk.CTkScrollbar(master=feed_frame, command=feed_scrolled, height=FEED_ROWS * 18)
+feed_scrollbar.grid(row=1, column=1, rowspan=FEED_ROWS, sticky="ns", padx=(0,5), pady=(0,5))
        
 scan_button = ctk.CTkButton(master=root, text="start scanning", height=30, font=("Roboto", 15), text_color="Black", command=scan_pressed)
 scan_button.pack( fill = "x", expand=True , pady = 0, padx = (10,2) , side = 'left')
@@ -477,10 +539,31 @@ pref_button = ctk.CTkButton(master=root, image=button_image, text="", width=30,
 pref_button.pack( pady = 0, padx = (2,10) , side = 'right' )
 
 
+# stop cleanly on close so the checkpoint is saved and queued alerts go out,
+# the window hides straight away and goes once everything has finished
+def close_window():
+    root.withdraw()
+
+    def shut_down():
+        try:
+            scanner.stop()
+            notify.shutdown()
+            metrics.stop_exporters()
+        finally:
+            post_event("closed")
+
+    threading.Thread(target=shut_down, name="Yo7 shutdown", daemon=True).start()
+
+
+root.protocol("WM_DELETE_WINDOW", close_window)
+
+
 #Open preference window if prefs not set
 if prefs_ready is False:
     root.after(750, pref_window)
 
+root.after(100, poll_events)
+
 
 #Running the main loop
 if __name__ == "__main__":
@@ -0,0 +1,57 @@
+# compares the old regex + json.loads journal loop with journal.parse_chat_line
+# usage: python benchmarks/bench_parser.py [number of lines] [chat ratio]
+import os
+import re
+import sys
+import json
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from yo7core.journal import journal_timestamp, parse_chat_line
+from journal_gen import make_journal
+
+
+# the per line work process_new_lines used to do before the fast path
+def old_path(lines, start):
+    start_timestamp = start.isoformat()
+    found = 0
+    for line in lines:
+        match = re.search(r'\{.*\}', line.decode("utf-8"))
+        if match:
+            log = json.loads(match.group())
+            timestamp = log.get("timestamp")
+            if timestamp and start_timestamp and timestamp > start_timestamp:
+                if log.get("event") in ("Receivetext", "ReceiveText"):
+                    found += 1
+    return found
+
+
+def new_path(lines, start):
+    since = journal_timestamp(start)
+    found = 0
+    for line in lines:
+        if parse_chat_line(line, since) is not None:
+            found += 1
+    return found
+
+
+def measure(func, lines, start, rounds=3):
+    best = None
+    for _ in range(rounds):
+        began = time.perf_counter()
+        found = func(lines, start)
+        took = time.perf_counter() - began
+        best = took if best is None else min(best, took)
+    return found, len(lines) / best
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    chat_ratio = float(sys.argv[2]) if len(sys.argv) > 2 else 0.02
+    lines, start = make_journal(count, chat_ratio)
+    print(f"{count} lines, {chat_ratio:.0%} chat, {sum(map(len, lines)) / 1e6:.1f} MB")
+    old_found, old_rate = measure(old_path, lines, start)
+    new_found, new_rate = measure(new_path, lines, start)
+    print(f"old path: {old_rate:12,.0f} lines/s  ({old_found} chat lines)")
+    print(f"new path: {new_rate:12,.0f} lines/s  ({new_found} chat lines)")
+    print(f"speedup:  {new_rate / old_rate:.1f}x")
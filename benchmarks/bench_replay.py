@@ -0,0 +1,221 @@
+# replays a synthetic journal into LogWatcher and measures write to dispatch latency, throughput, cpu and memory
+# usage: python benchmarks/bench_replay.py [--chat-rate 20] [--seconds 10] [--backend native|polling|hybrid|direct] ...
+import os
+import sys
+import glob
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from yo7core import config
+from yo7core.poller import JournalPoller
+from yo7core.watcher import LogWatcher
+from journal_gen import JournalWriter, SyntheticJournal
+
+RESULTS_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+# stands in for a watchdog event when the benchmark pokes the watcher itself
+class FakeEvent:
+    def __init__(self, event_type, src_path):
+        self.event_type = event_type
+        self.src_path = src_path
+        self.is_directory = False
+
+
+# records when each tagged message reached the end of the pipeline instead of notifying anyone
+class StubSink:
+    def __init__(self):
+        self.dispatched = {}
+
+    def __call__(self, record, channel_name, config_pull):
+        tag = record["message"].rsplit("#", 1)[-1]
+        if tag.isdigit():
+            self.dispatched[int(tag)] = time.perf_counter()
+
+
+def caught_up(watcher, writer):
+    return watcher.latest_log == writer.path() and watcher.tailer.offset >= os.path.getsize(writer.path())
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def max_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # linux reports kilobytes, macos bytes
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def version_label():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or "local"
+    except OSError:
+        return "local"
+
+
+def replay(args):
+    workspace = tempfile.mkdtemp(prefix="yo7-bench-")
+    folder = os.path.join(workspace, "journals")
+    os.makedirs(folder)
+    settings = {"logfile_name": folder, "notif_type": "benchmark", "volume": 0, "webhook_url": "",
+                "DM": "on", "LOCAL": "on", "SYSTEM": "on", "WING": "on", "SQUAD": "on", "VC": "on"}
+    config_file = os.path.join(workspace, "config.json")
+    with open(config_file, "w") as savefile:
+        json.dump(settings, savefile)
+    config.use_config_file(config_file)
+
+    generator = SyntheticJournal(args.chat_ratio, (args.min_length, args.max_length), seed=args.seed)
+    writer = JournalWriter(folder, generator, lines_per_file=args.lines_per_file)
+    sink = StubSink()
+    watcher = LogWatcher(folder, on_message=sink, checkpoint_file=os.path.join(workspace, "checkpoint.json"))
+    observer = None
+    if args.backend in ("native", "hybrid"):
+        from watchdog.observers import Observer
+        observer = Observer()
+        observer.schedule(watcher, path=folder, recursive=False)
+        observer.start()
+    if args.backend in ("polling", "hybrid"):
+        watcher.poller = JournalPoller(watcher, args.poll_min, args.poll_max, hybrid=args.backend == "hybrid").start()
+
+    written = {}
+    # a chat rate of 0 writes as fast as possible
+    line_rate = args.chat_rate / args.chat_ratio if args.chat_rate > 0 else float("inf")
+    lines_written = 0
+    cpu_started = time.process_time()
+    started = time.perf_counter()
+    try:
+        while True:
+            elapsed = time.perf_counter() - started
+            if elapsed >= args.seconds:
+                break
+            due = int(min(elapsed * line_rate, lines_written + args.burst)) - lines_written
+            if due > 0:
+                part = writer.part
+                tags = writer.write(due)
+                stamp = writer.last_write
+                for tag in tags:
+                    written[tag] = stamp
+                lines_written += due
+                if args.backend == "direct":
+                    if writer.part != part:
+                        watcher.dispatch(FakeEvent("created", writer.path()))
+                    watcher.dispatch(FakeEvent("modified", watcher.latest_log))
+            if args.chat_rate > 0:
+                time.sleep(args.tick)
+        # give the pipeline a moment to read whatever is still in flight
+        drain_until = time.perf_counter() + args.drain
+        while time.perf_counter() < drain_until and not caught_up(watcher, writer):
+            time.sleep(0.001)
+            if args.backend == "direct":
+                watcher.dispatch(FakeEvent("modified", watcher.latest_log))
+        took = time.perf_counter() - started
+        cpu = time.process_time() - cpu_started
+    finally:
+        if observer is not None:
+            observer.stop()
+            observer.join()
+        watcher.stop()
+        writer.close()
+        shutil.rmtree(workspace, ignore_errors=True)
+
+    scenario = {"backend": args.backend, "chat_rate": args.chat_rate, "chat_ratio": args.chat_ratio,
+                "seconds": args.seconds, "min_length": args.min_length, "max_length": args.max_length,
+                "lines_per_file": args.lines_per_file}
+    if args.backend in ("polling", "hybrid"):
+        scenario["poll"] = [args.poll_min, args.poll_max]
+    latencies = [(sink.dispatched[tag] - written[tag]) * 1000 for tag in sink.dispatched if tag in written]
+    return {
+        "label": args.label,
+        "when": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "scenario": scenario,
+        "lines_written": lines_written,
+        "chat_written": len(written),
+        "chat_dispatched": len(sink.dispatched),
+        "lines_per_second": lines_written / took,
+        "chat_per_second": len(sink.dispatched) / took,
+        "latency_ms_p50": percentile(latencies, 0.50),
+        "latency_ms_p99": percentile(latencies, 0.99),
+        "latency_ms_max": max(latencies) if latencies else None,
+        "cpu_seconds": cpu,
+        "cpu_percent": cpu / took * 100,
+        "max_rss_mb": max_rss_mb(),
+    }
+
+
+# the newest saved run of the same scenario, so a regression shows up as a delta
+def previous_result(result):
+    for path in sorted(glob.glob(os.path.join(RESULTS_FOLDER, "replay-*.json")), reverse=True):
+        try:
+            with open(path, "r") as pullfile:
+                earlier = json.load(pullfile)
+        except (OSError, ValueError):
+            continue
+        if earlier.get("scenario") == result["scenario"]:
+            return earlier
+    return None
+
+
+def report(result, earlier):
+    print(f"{result['label']}  {result['scenario']['backend']} backend, {result['scenario']['chat_rate']} chat/s for {result['scenario']['seconds']}s")
+    print(f"  lines/s           {result['lines_per_second']:10.0f}")
+    print(f"  chat dispatched   {result['chat_dispatched']:10d} of {result['chat_written']} written ($ senders are filtered)")
+    for key, name in (("latency_ms_p50", "p50 latency ms"), ("latency_ms_p99", "p99 latency ms"),
+                      ("cpu_percent", "cpu %"), ("max_rss_mb", "max rss MB")):
+        value = result[key]
+        if value is None:
+            continue
+        line = f"  {name:17} {value:10.2f}"
+        if earlier and earlier.get(key):
+            line += f"   ({(value - earlier[key]) / earlier[key]:+.0%} vs {earlier['label']})"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="replay a synthetic journal into LogWatcher")
+    parser.add_argument("--backend", choices=("native", "polling", "hybrid", "direct"), default="native",
+                        help="native uses watchdog, direct hands the watcher its events without an observer")
+    parser.add_argument("--poll-min", type=float, default=0.25, help="shortest polling interval, polling and hybrid only")
+    parser.add_argument("--poll-max", type=float, default=5, help="longest polling interval, polling and hybrid only")
+    parser.add_argument("--chat-rate", type=float, default=20, help="chat lines written per second, 0 for as fast as possible")
+    parser.add_argument("--chat-ratio", type=float, default=0.05, help="share of journal lines that are chat")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--min-length", type=int, default=2, help="shortest chat message")
+    parser.add_argument("--max-length", type=int, default=120, help="longest chat message")
+    parser.add_argument("--lines-per-file", type=int, default=20000, help="lines before rolling over to the next journal part")
+    parser.add_argument("--tick", type=float, default=0.01, help="seconds between writes")
+    parser.add_argument("--burst", type=int, default=1000, help="most lines written in one go")
+    parser.add_argument("--drain", type=float, default=5, help="seconds to wait for stragglers at the end")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--label", default=version_label())
+    parser.add_argument("--no-save", action="store_true", help="dont keep the result in benchmarks/results")
+    args = parser.parse_args()
+
+    result = replay(args)
+    report(result, previous_result(result))
+    if not args.no_save:
+        os.makedirs(RESULTS_FOLDER, exist_ok=True)
+        name = f"replay-{result['when'].replace(':', '')[:17]}-{result['label']}.json"
+        with open(os.path.join(RESULTS_FOLDER, name), "w") as savefile:
+            json.dump(result, savefile, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# per message cost of the filter rules as the number of rules grows, the compiled RuleSet against
+# checking every keyword and pattern one by one
+# usage: python benchmarks/bench_rules.py [number of messages]
+import os
+import re
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from yo7core.rules import RuleSet
+from journal_gen import SyntheticJournal
+
+RULE_COUNTS = [0, 10, 50, 100, 250, 500, 1000]
+
+
+# made up words the messages never contain, so every rule has to be looked at
+def make_rules(count, seed=11):
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    keywords = ["".join(rng.choice(letters) for _ in range(rng.randint(4, 10))) for _ in range(count)]
+    patterns = [rf"{word}\d+" for word in keywords[:count // 10]]
+    commanders = [f"CMDR {word}" for word in keywords[:count // 10]]
+    return keywords[count // 10:], patterns, commanders
+
+
+# what a straightforward version would do, one search per rule
+def naive_check(rules, record):
+    keywords, patterns, commanders = rules
+    if record["from"] in commanders:
+        return None
+    message = record["message"]
+    for word in keywords:
+        if re.search(rf"(?<!\w){re.escape(word)}(?!\w)", message, re.IGNORECASE):
+            return None
+    for pattern in patterns:
+        if re.search(pattern, message, re.IGNORECASE):
+            return None
+    return "rules"
+
+
+def measure(check, records, rounds=3):
+    best = None
+    for _ in range(rounds):
+        began = time.perf_counter()
+        for record in records:
+            check(record)
+        took = time.perf_counter() - began
+        best = took if best is None else min(best, took)
+    return best / len(records) * 1e6
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    journal = SyntheticJournal()
+    records = [{"from": chat["From"], "message": chat["Message"]}
+               for chat in (journal.chat("2025-01-01T00:00:00Z") for _ in range(count))]
+    print(f"{count} messages, microseconds per message")
+    print(f"{'rules':>6} {'compiled':>10} {'naive':>10}")
+    for rule_count in RULE_COUNTS:
+        rules = make_rules(rule_count)
+        began = time.perf_counter()
+        compiled = RuleSet(*rules)
+        build = (time.perf_counter() - began) * 1000
+        compiled_cost = measure(compiled.check, records)
+        # the naive loop gets slow quickly, a smaller sample is enough to show it
+        naive_cost = measure(lambda record: naive_check(rules, record), records[:max(20, 20000 // max(rule_count, 1))], rounds=1)
+        print(f"{rule_count:>6} {compiled_cost:>10.2f} {naive_cost:>10.2f}   (compiled in {build:.1f} ms)")
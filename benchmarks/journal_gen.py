@@ -0,0 +1,134 @@
+# synthetic elite dangerous journals for the benchmarks, in memory or appended to a folder at a set rate
+import os
+import json
+import time
+import random
+from datetime import datetime, timedelta, timezone
+
+
+NOISE = [
+    lambda ts: {"timestamp": ts, "event": "Music", "MusicTrack": "Exploration"},
+    lambda ts: {"timestamp": ts, "event": "FSSSignalDiscovered", "SystemAddress": 3932277478106, "SignalName": "$MULTIPLAYER_SCENARIO42_TITLE;",
+                "SignalName_Localised": "Nav Beacon", "IsStation": False},
+    lambda ts: {"timestamp": ts, "event": "Scan", "ScanType": "Detailed", "BodyName": "Col 285 Sector AB-C d13-37 A 4",
+                "BodyID": 12, "DistanceFromArrivalLS": 1834.22, "TidalLock": False, "TerraformState": "",
+                "PlanetClass": "Icy body", "Atmosphere": "", "Volcanism": "", "MassEM": 0.0712, "Radius": 2702331.5,
+                "SurfaceGravity": 3.88, "SurfaceTemperature": 61.4, "SurfacePressure": 0.0, "Landable": True,
+                "Materials": [{"Name": "sulphur", "Percent": 21.3}, {"Name": "carbon", "Percent": 17.9},
+                              {"Name": "phosphorus", "Percent": 11.5}, {"Name": "iron", "Percent": 9.6}]},
+    lambda ts: {"timestamp": ts, "event": "CarrierJumpRequest", "CarrierID": 3700000000, "SystemName": "Sol", "Body": "Earth",
+                "SystemAddress": 10477373803, "BodyID": 3, "DepartureTime": ts},
+    lambda ts: {"timestamp": ts, "event": "ReservoirReplenished", "FuelMain": 31.7, "FuelReservoir": 0.63},
+    lambda ts: {"timestamp": ts, "event": "NpcCrewPaidWage", "NpcCrewName": "Zoe Kent", "NpcCrewId": 12345, "Amount": 0},
+]
+
+CHANNELS = ["player", "local", "starsystem", "wing", "squadron", "voicechat"]
+SENDERS = ["$npc_name_decorate:#name=Pirate;", "CMDR Jameson", "Kelly Adair", "o7 Dave"]
+WORDS = ["o7", "anyone", "selling", "tritium", "fly", "safe", "commander", "wing", "up", "at", "the", "carrier",
+         "help", "interdicted", "nav", "beacon", "$Pirate_OnStartScanCargo07;"]
+
+
+# journal lines are written by the game with a space after the opening brace
+def journal_line(entry):
+    return ("{ " + json.dumps(entry, separators=(", ", ":"))[1:] + "\r\n").encode("utf-8")
+
+
+def timestamp(moment):
+    return moment.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class SyntheticJournal:
+    def __init__(self, chat_ratio=0.02, message_length=(2, 80), channels=CHANNELS, seed=7):
+        self.random = random.Random(seed)
+        self.chat_ratio = chat_ratio
+        self.message_length = message_length
+        self.channels = channels
+        self.sequence = 0
+
+    def chat(self, ts, tag=None):
+        length = self.random.randint(*self.message_length)
+        words = []
+        while sum(len(word) + 1 for word in words) < length:
+            words.append(self.random.choice(WORDS))
+        message = " ".join(words)[:length]
+        if tag is not None:
+            message = f"{message} #{tag}"
+        return {"timestamp": ts, "event": "ReceiveText", "From": self.random.choice(SENDERS),
+                "Message": message, "Channel": self.random.choice(self.channels)}
+
+    # one journal line, plus the sequence number when it is a tagged chat line
+    def line(self, moment, tag_chat=False):
+        ts = timestamp(moment)
+        if self.random.random() < self.chat_ratio:
+            self.sequence += 1
+            tag = self.sequence if tag_chat else None
+            return journal_line(self.chat(ts, tag)), tag
+        return journal_line(self.random.choice(NOISE)(ts)), None
+
+    def header(self, moment, part):
+        return journal_line({"timestamp": timestamp(moment), "event": "Fileheader", "part": part, "language": "English/UK",
+                             "Odyssey": True, "gameversion": "4.0.0.1904", "build": "r308767/r0 "})
+
+
+# builds a journal that looks like a long carrier/exploration session, mostly non chat events
+def make_journal(count, chat_ratio):
+    generator = SyntheticJournal(chat_ratio)
+    first = datetime(2025, 4, 14, 20, 0, 0, tzinfo=timezone.utc)
+    moment = first
+    lines = []
+    for _ in range(count):
+        moment += timedelta(seconds=generator.random.choice((0, 0, 1, 2)))
+        lines.append(generator.line(moment)[0])
+    # pretend scanning started a quarter of the way through the session
+    return lines, first + (moment - first) / 4
+
+
+# appends to Journal.*.log files in a folder the way the game does, rolling over to a new part when one fills up
+class JournalWriter:
+    def __init__(self, folder, generator, lines_per_file=50000, started=None):
+        self.folder = folder
+        self.generator = generator
+        self.lines_per_file = lines_per_file
+        self.started = started or datetime.now(timezone.utc)
+        self.part = 0
+        self.handle = None
+        self.written = 0
+        self.last_write = None
+        self.rollover()
+
+    def path(self):
+        return os.path.join(self.folder, f"Journal.{self.started.strftime('%Y-%m-%dT%H%M%S')}.{self.part:02d}.log")
+
+    def rollover(self):
+        if self.handle is not None:
+            self.handle.close()
+        self.part += 1
+        self.written = 0
+        self.handle = open(self.path(), "ab")
+        self.handle.write(self.generator.header(datetime.now(timezone.utc), self.part))
+        self.handle.flush()
+
+    # writes count lines in one go and returns the sequence numbers of the chat lines among them
+    def write(self, count):
+        moment = datetime.now(timezone.utc)
+        tags = []
+        chunk = []
+        for _ in range(count):
+            line, tag = self.generator.line(moment, tag_chat=True)
+            chunk.append(line)
+            if tag is not None:
+                tags.append(tag)
+        data = b"".join(chunk)
+        # latency is measured from the moment the bytes are handed to the os
+        self.last_write = time.perf_counter()
+        self.handle.write(data)
+        self.handle.flush()
+        self.written += count
+        if self.written >= self.lines_per_file:
+            self.rollover()
+        return tags
+
+    def close(self):
+        if self.handle is not None:
+            self.handle.close()
+            self.handle = None
@@ -0,0 +1,43 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from yo7core.backfill import backfill
+
+
+def chat_line(timestamp, message):
+    return (f'{{ "timestamp":"{timestamp}", "event":"ReceiveText", "From":"Bob", '
+            f'"Message":"{message}", "Channel":"player" }}\n')
+
+
+class BackfillTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.addCleanup(self.folder.cleanup)
+
+    def journal(self, name, *lines):
+        with open(os.path.join(self.folder.name, name), "w") as journal:
+            journal.writelines(chat_line(timestamp, message) for timestamp, message in lines)
+
+    def messages(self, **kwargs):
+        return [record["message"] for record in backfill(self.folder.name, workers=1, **kwargs)]
+
+    def test_since_inside_a_multi_part_session(self):
+        self.journal("Journal.2025-04-14T200000.01.log", ("2025-04-14T20:01:00Z", "early"),
+                     ("2025-04-14T20:05:00Z", "late"))
+        self.journal("Journal.2025-04-14T200000.02.log", ("2025-04-14T20:10:00Z", "part two"))
+        self.assertEqual(self.messages(since="2025-04-14T20:04:00Z"), ["late", "part two"])
+
+    def test_since_skips_sessions_that_ended_before_it(self):
+        self.journal("Journal.2025-04-13T200000.01.log", ("2025-04-13T20:01:00Z", "yesterday"))
+        self.journal("Journal.2025-04-14T200000.01.log", ("2025-04-14T20:01:00Z", "today"))
+        self.journal("Journal.2025-04-14T200000.02.log", ("2025-04-14T20:10:00Z", "part two"))
+        self.journal("Journal.2025-04-15T200000.01.log", ("2025-04-15T20:01:00Z", "tomorrow"))
+        self.assertEqual(self.messages(since="2025-04-14T00:00:00Z"), ["today", "part two", "tomorrow"])
+        self.assertEqual(self.messages(since="2025-04-14T20:05:00Z", until="2025-04-14"), ["part two"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from yo7core.rules import RuleSet
+
+
+def passes(rules, message, sender="CMDR Jameson"):
+    return rules.check({"from": sender, "message": message}) is None
+
+
+class RuleSetTest(unittest.TestCase):
+    def test_keywords_match_whole_words_in_any_case(self):
+        rules = RuleSet(keywords=["o7", "Help", "need wing"])
+        self.assertTrue(passes(rules, "O7 cmdr"))
+        self.assertTrue(passes(rules, "HELP please"))
+        self.assertTrue(passes(rules, "we NEED WING now"))
+        self.assertFalse(passes(rules, "xo7"))
+        self.assertFalse(passes(rules, "helpful"))
+
+    def test_patterns_ignore_case(self):
+        rules = RuleSet(patterns=["colou?r", r"carrier\d+", "^start", "x{2}"])
+        self.assertTrue(passes(rules, "COLOR"))
+        self.assertTrue(passes(rules, "a CARRIER7"))
+        self.assertTrue(passes(rules, "Start here"))
+        self.assertTrue(passes(rules, "XX"))
+        self.assertFalse(passes(rules, "Carrier"))
+        self.assertFalse(passes(rules, "no start"))
+
+    def test_patterns_that_cant_be_combined(self):
+        rules = RuleSet(patterns=[r"(\w)\1", "(?P<tag>zz)"])
+        self.assertTrue(passes(rules, "aa"))
+        self.assertTrue(passes(rules, "ZZ"))
+        self.assertFalse(passes(rules, "abc"))
+
+    def test_commanders(self):
+        rules = RuleSet(keywords=["o7"], commanders=["CMDR Jameson"], blocked=["Spammer"])
+        self.assertTrue(passes(rules, "anything", sender="cmdr jameson"))
+        self.assertFalse(passes(rules, "o7", sender="SPAMMER"))
+        self.assertTrue(passes(RuleSet(), "anything"))
+
+
+if __name__ == "__main__":
+    unittest.main()
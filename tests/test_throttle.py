@@ -0,0 +1,160 @@
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from yo7core.throttle import BoundedCache, Throttle, ThrottledNotifier, TokenBucket
+
+
+# time only moves when the test says so
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def chat(message, sender="CMDR Jameson", channel="wing"):
+    return {"timestamp": "2025-04-14T20:00:00Z", "channel": channel, "from": sender, "message": message}
+
+
+def settings(**throttle):
+    return {"name": "main", "throttle": throttle}
+
+
+def messages(sent):
+    return [record["message"] for record, channel_name, config_pull in sent]
+
+
+class TokenBucketTest(unittest.TestCase):
+    def test_burst_then_refill(self):
+        bucket = TokenBucket(rate=1, burst=2, now=0)
+        self.assertTrue(bucket.take(0))
+        self.assertTrue(bucket.take(0))
+        self.assertFalse(bucket.take(0.5))
+        self.assertTrue(bucket.take(1.5))
+        self.assertFalse(bucket.take(1.5))
+
+    def test_never_saves_more_than_burst(self):
+        bucket = TokenBucket(rate=1, burst=2, now=0)
+        taken = [bucket.take(100) for _ in range(3)]
+        self.assertEqual(taken, [True, True, False])
+
+
+class BoundedCacheTest(unittest.TestCase):
+    def test_forgets_least_recently_used(self):
+        cache = BoundedCache(2)
+        cache.touch("a", lambda: 1)
+        cache.touch("b", lambda: 2)
+        cache.touch("a", lambda: 0)
+        cache.touch("c", lambda: 3)
+        self.assertEqual(list(cache), ["a", "c"])
+
+    def test_put_replaces_and_stays_bounded(self):
+        cache = BoundedCache(2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.put("a", 3)
+        cache.put("c", 4)
+        self.assertEqual(dict(cache), {"a": 3, "c": 4})
+
+
+class ThrottleTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.throttle = Throttle(clock=self.clock)
+
+    def offer(self, when, message, config_pull, **kwargs):
+        self.clock.now = when
+        return messages(self.throttle.offer(chat(message, **kwargs), "WING", config_pull))
+
+    def test_no_settings_passes_everything(self):
+        config_pull = settings()
+        self.assertEqual([self.offer(0, "o7", config_pull) for _ in range(3)], [["o7"], ["o7"], ["o7"]])
+
+    def test_duplicates_suppressed_inside_window(self):
+        config_pull = settings(duplicate_seconds=10)
+        self.assertEqual(self.offer(0, "o7", config_pull), ["o7"])
+        self.assertEqual(self.offer(5, "o7", config_pull), [])
+        self.assertEqual(self.offer(6, "o7", config_pull, sender="Kelly Adair"), ["o7"])
+        self.assertEqual(self.offer(16, "o7", config_pull), ["o7"])
+
+    def test_commander_bucket(self):
+        config_pull = settings(commander_per_minute=60, commander_burst=2)
+        sent = [self.offer(0, f"m{number}", config_pull) for number in range(3)]
+        self.assertEqual(sent, [["m0"], ["m1"], []])
+        self.assertEqual(self.offer(0, "other", config_pull, sender="Kelly Adair"), ["other"])
+        self.assertEqual(self.offer(1, "m3", config_pull), ["m3"])
+
+    def test_channel_bucket(self):
+        config_pull = settings(channel_per_minute=60, channel_burst=1)
+        self.assertEqual(self.offer(0, "a", config_pull), ["a"])
+        self.assertEqual(self.offer(0.5, "b", config_pull, sender="Kelly Adair"), [])
+        self.assertEqual(self.offer(1.5, "c", config_pull), ["c"])
+
+    def test_coalescing_sends_leading_message_then_digest(self):
+        config_pull = settings(coalesce_seconds=5)
+        self.assertEqual(self.offer(0, "msg1", config_pull), ["msg1"])
+        self.assertEqual(self.offer(1, "msg2", config_pull), [])
+        self.assertEqual(self.offer(2, "msg3", config_pull), [])
+        self.clock.now = 4
+        self.assertEqual(self.throttle.flush(), [])
+        self.assertEqual(self.throttle.next_due(), 5)
+        self.clock.now = 5
+        ready = self.throttle.flush()
+        self.assertEqual(len(ready), 1)
+        record, channel_name, config_pull = ready[0]
+        self.assertEqual(channel_name, "WING")
+        self.assertEqual([item["message"] for name, item in record["digest"]], ["msg2", "msg3"])
+        # an empty window closes without sending anything
+        self.clock.now = 10
+        self.assertEqual(self.throttle.flush(), [])
+        self.assertIsNone(self.throttle.next_due())
+
+    def test_expired_window_digest_not_lost_before_flush(self):
+        config_pull = settings(coalesce_seconds=5)
+        self.assertEqual(self.offer(0, "msg1", config_pull), ["msg1"])
+        self.assertEqual(self.offer(1, "msg2", config_pull), [])
+        self.assertEqual(self.offer(2, "msg3", config_pull), [])
+        self.clock.now = 6
+        sent = self.throttle.offer(chat("msg4"), "WING", config_pull)
+        self.assertEqual(len(sent), 2)
+        self.assertEqual([item["message"] for name, item in sent[0][0]["digest"]], ["msg2", "msg3"])
+        self.assertEqual(sent[1][0]["message"], "msg4")
+        self.assertEqual(self.throttle.flush(), [])
+
+    def test_digest_is_capped(self):
+        self.throttle = Throttle(clock=self.clock, max_digest=2)
+        config_pull = settings(coalesce_seconds=5)
+        for number in range(5):
+            self.offer(number / 10, f"m{number}", config_pull)
+        record = self.throttle.flush(force=True)[0][0]
+        self.assertEqual(len(record["digest"]), 2)
+        self.assertEqual(record["more"], 2)
+        self.assertEqual(record["from"], "4 messages")
+
+
+class ThrottledNotifierTest(unittest.TestCase):
+    def test_one_timer_however_many_readers_start_it(self):
+        notifier = ThrottledNotifier(lambda *item: None)
+        gate = threading.Barrier(8)
+
+        def start():
+            gate.wait()
+            notifier.start()
+
+        readers = [threading.Thread(target=start) for _ in range(8)]
+        for reader in readers:
+            reader.start()
+        for reader in readers:
+            reader.join()
+        timers = [thread for thread in threading.enumerate() if thread.name == "Yo7 throttle"]
+        self.assertEqual(timers, [notifier.thread])
+        notifier.stop()
+        self.assertIsNone(notifier.thread)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,5 @@
+# core of Yo7 without any gui, heavy libraries (watchdog, pygame, requests) are only imported when used
+from yo7core.config import config_exists, load_config, save_config, use_config_file
+from yo7core.events import report_error, set_error_handler
+from yo7core.journal import CHANNEL_NAMES, JournalIndex, JournalTailer, journal_timestamp, parse_chat_line
+from yo7core.watcher import LogWatcher, Scanner
@@ -0,0 +1,5 @@
+from yo7core.cli import main
+
+# the guard matters, the backfill process pool re-imports this module in its workers on windows
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+import time
+import queue
+import sqlite3
+import threading
+
+from yo7core import metrics
+from yo7core.events import report_error
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    commander TEXT NOT NULL COLLATE NOCASE,
+    message TEXT NOT NULL,
+    account TEXT NOT NULL DEFAULT 'main',
+    journal TEXT,
+    offset INTEGER,
+    UNIQUE (account, journal, offset)
+);
+CREATE INDEX IF NOT EXISTS messages_time ON messages (timestamp);
+CREATE INDEX IF NOT EXISTS messages_channel ON messages (channel, timestamp);
+CREATE INDEX IF NOT EXISTS messages_commander ON messages (commander, timestamp);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(message, content='messages', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+    INSERT INTO messages_fts (rowid, message) VALUES (new.id, new.message);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+    INSERT INTO messages_fts (messages_fts, rowid, message) VALUES ('delete', old.id, old.message);
+END;
+"""
+
+COLUMNS = ("timestamp", "channel", "commander", "message", "account", "journal", "offset")
+
+
+def connect(path):
+    connection = sqlite3.connect(path, timeout=10, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+# fts5 query that treats what the user typed as plain words, not query syntax
+def fts_query(text):
+    return " ".join('"' + word.replace('"', '""') + '"' for word in text.split())
+
+
+# local sqlite store of every chat message seen. writes are queued and committed in batches on
+# their own thread, reads use their own connection so searching never waits on live ingestion
+class ChatArchive:
+    def __init__(self, path="chat.db", batch_size=500, flush_interval=1.0, max_pending=10000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.records = queue.Queue(maxsize=max_pending)
+        connection = connect(path)
+        with connection:
+            connection.executescript(SCHEMA)
+            try:
+                connection.executescript(FTS_SCHEMA)
+                self.fts = True
+            except sqlite3.OperationalError:
+                # sqlite built without fts5, searching falls back to LIKE
+                self.fts = False
+        self.writer = connection
+        self.reader = None
+        self.reader_lock = threading.Lock()
+        self.thread = threading.Thread(target=self.run, name="Yo7 archive", daemon=True)
+        self.thread.start()
+
+    def row(self, record, account):
+        return (record["timestamp"], record.get("channel_name") or record["channel"], record["from"], record["message"],
+                account or record.get("account") or "main", record.get("journal"), record.get("offset"))
+
+    # queue one chat record, never blocks the watcher
+    def add(self, record, account=None):
+        try:
+            self.records.put_nowait(self.row(record, account))
+        except queue.Full:
+            metrics.notifications_dropped.inc(sink="archive")
+
+    # bulk imports like backfill wait for room in the queue instead of dropping
+    def add_many(self, records, account=None):
+        count = 0
+        for record in records:
+            self.records.put(self.row(record, account))
+            count += 1
+        return count
+
+    def run(self):
+        stopping = False
+        while not stopping:
+            row = self.records.get()
+            if row is None:
+                break
+            rows = [row]
+            deadline = time.monotonic() + self.flush_interval
+            while len(rows) < self.batch_size:
+                try:
+                    row = self.records.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if row is None:
+                    stopping = True
+                    break
+                rows.append(row)
+            self.write(rows)
+        self.writer.close()
+
+    def write(self, rows):
+        try:
+            with self.writer:
+                self.writer.executemany(f"INSERT OR IGNORE INTO messages ({', '.join(COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            metrics.notifications_sent.inc(len(rows), sink="archive")
+        except sqlite3.Error as e:
+            metrics.notifications_failed.inc(len(rows), sink="archive")
+            report_error(f"chat archive: {e}")
+
+    def close(self):
+        self.records.put(None)
+        self.thread.join()
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
+
+    def search(self, text=None, channel=None, commander=None, since=None, until=None, limit=100):
+        conditions = []
+        values = []
+        if text and self.fts:
+            conditions.append("id IN (SELECT rowid FROM messages_fts WHERE messages_fts MATCH ?)")
+            values.append(fts_query(text))
+        elif text:
+            conditions.append("message LIKE ?")
+            values.append(f"%{text}%")
+        if channel:
+            conditions.append("channel = ?")
+            values.append(channel.upper())
+        if commander:
+            # the column is NOCASE, so this matches any case and still uses messages_commander
+            conditions.append("commander = ?")
+            values.append(commander)
+        if since:
+            conditions.append("timestamp >= ?")
+            values.append(since)
+        if until:
+            # a bare date includes the whole day, so stop before the first timestamp that no longer starts with it
+            conditions.append("timestamp < ?")
+            values.append(until[:-1] + chr(ord(until[-1]) + 1))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        query = f"SELECT {', '.join(COLUMNS)} FROM messages {where} ORDER BY timestamp DESC, id DESC LIMIT ?"
+        with self.reader_lock:
+            if self.reader is None:
+                self.reader = connect(self.path)
+            rows = self.reader.execute(query, values + [limit]).fetchall()
+        return [dict(zip(COLUMNS, row)) for row in rows]
@@ -0,0 +1,105 @@
+import time
+import queue
+import threading
+
+from yo7core import metrics
+from yo7core.events import report_error
+
+
+# long lived sound player, keeps the mixer open and the wav decoded so alerts dont stall the watcher
+class AudioEngine:
+    def __init__(self, sound_file="Yo7.wav", max_pending=4):
+        self.sound_file = sound_file
+        self.requests = queue.Queue(maxsize=max_pending)
+        self.sound = None
+        self.busy_until = 0
+        # set when the mixer or the wav couldnt be loaded, so every later alert doesnt try and fail again
+        self.failed = False
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.thread is None and not self.failed:
+                self.thread = threading.Thread(target=self.run, name="Yo7 audio", daemon=True)
+                self.thread.start()
+
+    # queue up a play request, never blocks the caller
+    def play(self, volume, event_time=None):
+        if self.failed:
+            metrics.notifications_failed.inc(sink="sound")
+            return
+        self.start()
+        try:
+            self.requests.put_nowait((volume, time.perf_counter(), event_time))
+        except queue.Full:
+            metrics.notifications_dropped.inc(sink="sound")
+
+    def stop(self):
+        if self.thread is not None:
+            self.requests.put(None)
+            self.thread.join(timeout=2)
+            self.thread = None
+
+    # the next alert tries loading again, for when the settings changed since it failed
+    def retry(self):
+        self.failed = False
+
+    def load(self):
+        # pygame is only pulled in once the first alert actually needs it
+        import pygame
+        pygame.mixer.init(frequency=44100, size=-16, channels=1, buffer=512)
+        self.sound = pygame.mixer.Sound(self.sound_file)
+
+    def run(self):
+        try:
+            self.load()
+        except Exception as e:
+            report_error(e)
+            with self.lock:
+                self.failed = True
+                self.thread = None
+            # whatever queued up while loading will never play
+            while True:
+                try:
+                    request = self.requests.get_nowait()
+                except queue.Empty:
+                    break
+                if request is not None:
+                    metrics.notifications_failed.inc(sink="sound")
+            return
+        while True:
+            request = self.requests.get()
+            if request is None:
+                break
+            # anything that queued up while we waited folds into this one alert
+            covered = [request]
+            stopping = False
+            while not self.requests.empty():
+                extra = self.requests.get_nowait()
+                if extra is None:
+                    stopping = True
+                    break
+                covered.append(extra)
+            volume = max(volume for volume, queued_at, event_time in covered)
+            # an alert is still ringing out, no point stacking another on top
+            if time.monotonic() < self.busy_until:
+                metrics.notifications_coalesced.inc(len(covered), sink="sound")
+                covered = []
+            else:
+                try:
+                    self.sound.set_volume(volume)
+                    self.sound.play()
+                    self.busy_until = time.monotonic() + self.sound.get_length()
+                except Exception as e:
+                    metrics.notifications_failed.inc(len(covered), sink="sound")
+                    report_error(e)
+                    covered = []
+            for volume, queued_at, event_time in covered:
+                metrics.notifications_sent.inc(sink="sound")
+                metrics.sink_seconds.observe(time.perf_counter() - queued_at, sink="sound")
+                metrics.observe_event_age(event_time, "sound")
+            if stopping:
+                break
+        import pygame
+        pygame.mixer.quit()
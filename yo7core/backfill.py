@@ -0,0 +1,103 @@
+import os
+import mmap
+import heapq
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+
+from yo7core.journal import CHANNEL_NAMES, CHAT_MARKERS, journal_key, parse_chat_line
+
+
+# a journal session name stamp (2025-04-14T210000) in the same form as the timestamps inside the journal
+def session_timestamp(key):
+    stamp = key[0]
+    return f"{stamp[:13]}:{stamp[13:15]}:{stamp[15:17]}Z"
+
+
+# every Journal.*.log in a folder, oldest first, with the time its session started
+def journal_files(folder):
+    journals = []
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            key = journal_key(entry.name)
+            if key is not None:
+                journals.append((key, entry.path))
+    journals.sort()
+    return [(session_timestamp(key), path) for key, path in journals]
+
+
+# when the session after each journal started, None for the last one. the parts of a session (.01, .02...)
+# all carry the stamp of its start, so the next part of the same session doesnt count
+def next_sessions(journals):
+    following = [None] * len(journals)
+    later = None
+    for number in range(len(journals) - 1, -1, -1):
+        following[number] = later
+        if number and journals[number - 1][0] != journals[number][0]:
+            later = journals[number][0]
+    return following
+
+
+# the raw lines of a journal that mention a chat event, with their byte offsets, found without splitting the file
+def chat_lines(data):
+    found = {}
+    for marker in CHAT_MARKERS:
+        position = data.find(marker)
+        while position >= 0:
+            start = data.rfind(b"\n", 0, position) + 1
+            end = data.find(b"\n", position)
+            if end < 0:
+                end = len(data)
+            found[start] = data[start:end]
+            position = data.find(marker, end)
+    return sorted(found.items())
+
+
+# the same chat extraction the live watcher does, over a whole journal file. runs in a worker process
+def extract_file(path, since=None, until=None, include_npc=False):
+    records = []
+    with open(path, "rb") as handle:
+        if os.fstat(handle.fileno()).st_size == 0:
+            return records
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            lines = chat_lines(data)
+    name = os.path.basename(path)
+    for offset, line in lines:
+        record = parse_chat_line(line, since)
+        if record is None:
+            continue
+        if until and record["timestamp"][:len(until)] > until:
+            continue
+        if not include_npc and (record["from"].startswith("$") or record["message"].startswith("$")):
+            continue
+        record["channel_name"] = CHANNEL_NAMES.get(record["channel"], "Unknown")
+        record["journal"] = name
+        record["offset"] = offset
+        records.append(record)
+    return records
+
+
+# streams chat records from every journal in the folder in timestamp order. files are spread over a
+# process pool and come back in session order, a record is only let out once no later file can hold
+# anything older than it
+def backfill(folder, since=None, until=None, workers=None, include_npc=False):
+    journals = journal_files(folder)
+    if until:
+        journals = [(started, path) for started, path in journals if started[:len(until)] <= until]
+    if since:
+        # a session is only worth reading if the next one started after since
+        journals = [journal for journal, following in zip(journals, next_sessions(journals))
+                    if following is None or following >= since]
+    if not journals:
+        return
+    following_sessions = next_sessions(journals)
+    extract = partial(extract_file, since=since.encode() if since else None, until=until, include_npc=include_npc)
+    paths = [path for started, path in journals]
+    pending = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(extract, paths, chunksize=max(1, len(paths) // ((workers or os.cpu_count() or 1) * 8)))
+        for number, records in enumerate(results):
+            for record in records:
+                heapq.heappush(pending, (record["timestamp"], number, record["offset"], record))
+            following = following_sessions[number]
+            while pending and (following is None or pending[0][0] < following):
+                yield heapq.heappop(pending)[3]
@@ -0,0 +1,127 @@
+import sys
+import json
+import time
+import argparse
+
+from yo7core import config, metrics, notify
+from yo7core.events import report_error
+from yo7core.poller import BACKENDS
+from yo7core.watcher import Scanner
+
+
+# runs the scanner with no window until ctrl+c, handy for a second machine reading a synced journal folder
+def run(args):
+    metrics.export(args.metrics_file, args.metrics_port)
+    scanner = Scanner(profile_file=args.profile)
+    scanner.start(args.journal_folder, args.watcher)
+    if not scanner.scanning:
+        return 1
+    for watcher in scanner.watchers:
+        print(f"Yo7 scanning {watcher.folder} for {watcher.account}")
+    print("ctrl+c to stop")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        scanner.stop()
+        notify.shutdown()
+        metrics.stop_exporters()
+    return 0
+
+
+# looks through the chat archive, newest first
+def search(args):
+    from yo7core.archive import ChatArchive
+    path = args.db or (config.load_config() or {}).get("archive_file", "chat.db")
+    archive = ChatArchive(path)
+    try:
+        for row in archive.search(args.text, args.channel, args.commander, args.since, args.until, args.limit):
+            print(f"{row['timestamp']}  `{row['channel']}`   {row['commander']} :   {row['message']}")
+    finally:
+        archive.close()
+    return 0
+
+
+# pulls every chat message out of old journals, oldest first, as json lines or plain text
+def backfill(args):
+    from yo7core.backfill import backfill as extract
+    folder = args.folder or (config.load_config() or {}).get("logfile_name")
+    if not folder:
+        report_error("no journal folder given and none saved in the settings")
+        return 1
+    channels = set(args.channels.upper().split(",")) if args.channels else None
+    records = extract(folder, args.since, args.until, args.workers, args.include_npc)
+    if channels:
+        records = (record for record in records if record["channel_name"] in channels)
+    if args.archive:
+        from yo7core.archive import ChatArchive
+        archive = ChatArchive(args.archive)
+        try:
+            count = archive.add_many(records, account=args.account)
+        finally:
+            archive.close()
+        print(f"{count} messages archived in {args.archive}", file=sys.stderr)
+        return 0
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    count = 0
+    try:
+        for record in records:
+            if args.format == "jsonl":
+                output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            else:
+                output.write(f"{record['timestamp']}  `{record['channel_name']}`   {record['from']} :   {record['message']}\n")
+            count += 1
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    print(f"{count} messages", file=sys.stderr)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="yo7core", description="Yo7 chat notifications without the window")
+    parser.add_argument("--config", default=config.CONFIG_FILE, help="settings file saved by the Yo7 window")
+    subparsers = parser.add_subparsers(dest="command")
+
+    run_parser = subparsers.add_parser("run", help="watch the journal and send notifications (default)")
+    run_parser.add_argument("--journal-folder", help="journal folder to watch instead of the one in the settings")
+    run_parser.add_argument("--metrics-file", help="write metrics here every few seconds (.json for json, anything else prometheus text)")
+    run_parser.add_argument("--metrics-port", type=int, help="serve prometheus metrics on http://127.0.0.1:PORT/metrics")
+    run_parser.add_argument("--watcher", choices=BACKENDS,
+                            help="native file events, polling for network shares and synced folders, or hybrid")
+    run_parser.add_argument("--profile", help="profile the journal reader and write cProfile stats to this file on exit")
+    run_parser.set_defaults(func=run)
+
+    backfill_parser = subparsers.add_parser("backfill", help="extract chat from old journals in parallel, oldest first")
+    backfill_parser.add_argument("folder", nargs="?", help="journal folder, defaults to the one in the settings")
+    backfill_parser.add_argument("--since", help="only messages at or after this time, e.g. 2025-04-01 or 2025-04-01T20:00:00Z")
+    backfill_parser.add_argument("--until", help="only messages up to this time, a date includes the whole day")
+    backfill_parser.add_argument("--channels", help="comma separated channel names, e.g. DM,WING,SQUAD")
+    backfill_parser.add_argument("--include-npc", action="store_true", help="keep npc and system ($) messages")
+    backfill_parser.add_argument("--workers", type=int, help="worker processes, defaults to one per core")
+    backfill_parser.add_argument("--format", choices=("jsonl", "text"), default="jsonl")
+    backfill_parser.add_argument("--output", help="write here instead of stdout")
+    backfill_parser.add_argument("--archive", help="store the messages in this chat archive database instead")
+    backfill_parser.add_argument("--account", default="main", help="account name to store archived messages under")
+    backfill_parser.set_defaults(func=backfill)
+
+    search_parser = subparsers.add_parser("search", help="search the chat archive")
+    search_parser.add_argument("text", nargs="?", help="words that must all appear in the message")
+    search_parser.add_argument("--channel", help="DM, LOCAL, SYSTEM, WING, SQUAD or VC")
+    search_parser.add_argument("--commander", help="only messages from this commander")
+    search_parser.add_argument("--since", help="only messages at or after this time")
+    search_parser.add_argument("--until", help="only messages up to this time, a date includes the whole day")
+    search_parser.add_argument("--limit", type=int, default=50)
+    search_parser.add_argument("--db", help="archive database, defaults to archive_file in the settings or chat.db")
+    search_parser.set_defaults(func=search)
+
+    parser.set_defaults(func=run, journal_folder=None, metrics_file=None, metrics_port=None, profile=None, watcher=None)
+
+    args = parser.parse_args(argv)
+    config.use_config_file(args.config)
+    if not config.config_exists() and args.func is run:
+        report_error(f"{args.config} doesnt exist, save your settings in the Yo7 window first")
+        sys.exit(1)
+    sys.exit(args.func(args))
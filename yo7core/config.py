@@ -0,0 +1,120 @@
+import os
+import time
+import json
+import threading
+from types import MappingProxyType
+
+from yo7core.events import report_error
+
+# Constants
+CONFIG_FILE = "config.json"
+CHECKPOINT_FILE = "checkpoint.json"
+CONFIG_CHECK_INTERVAL = 2.0
+
+
+# shared read-only config snapshot, only re-read from disk when config.json changes
+config_lock = threading.Lock()
+config_snapshot = None
+config_stamp = None
+config_checked = 0
+profiles_cache = (None, ())
+
+
+# points the core at a different config file, used by the command line
+def use_config_file(path):
+    global CONFIG_FILE, config_snapshot, config_stamp
+    with config_lock:
+        CONFIG_FILE = path
+        config_snapshot = None
+        config_stamp = None
+
+
+def config_exists():
+    return os.path.exists(CONFIG_FILE)
+
+
+# size and mtime of the config file, used to spot edits made outside of Yo7
+def config_file_stamp():
+    try:
+        stat = os.stat(CONFIG_FILE)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def set_config_snapshot(config, stamp):
+    global config_snapshot, config_stamp, config_checked
+    config_snapshot = MappingProxyType(dict(config))
+    config_stamp = stamp
+    config_checked = time.monotonic()
+    return config_snapshot
+
+
+# function for reading save file, hands back the cached snapshot unless the file changed
+def load_config():
+    global config_checked
+    snapshot = config_snapshot
+    if snapshot is not None and time.monotonic() - config_checked < CONFIG_CHECK_INTERVAL:
+        return snapshot
+    with config_lock:
+        config_checked = time.monotonic()
+        stamp = config_file_stamp()
+        if stamp is None:
+            report_error("config file doesnt exist")
+            return config_snapshot
+        if stamp == config_stamp and config_snapshot is not None:
+            return config_snapshot
+        try:
+            with open(CONFIG_FILE, "r") as pullfile:
+                return set_config_snapshot(json.load(pullfile), stamp)
+        except FileNotFoundError:
+            report_error("config.json file doesnt exist")
+        except json.JSONDecodeError:
+            report_error("file format issuer \n(json decode error)")
+        return config_snapshot
+
+
+# every account in the config as its own read-only settings. the top level settings are the first
+# account, anything under "accounts" only has to list what differs from them (name, logfile_name, webhook...)
+def load_profiles():
+    global profiles_cache
+    snapshot = load_config()
+    if snapshot is None:
+        return ()
+    cached_for, profiles = profiles_cache
+    if cached_for is snapshot:
+        return profiles
+    base = {key: value for key, value in snapshot.items() if key != "accounts"}
+    base.setdefault("name", "main")
+    profiles = [MappingProxyType(base)]
+    for number, account in enumerate(snapshot.get("accounts") or (), start=2):
+        merged = dict(base)
+        merged["name"] = f"account{number}"
+        merged.update(account)
+        profiles.append(MappingProxyType(merged))
+    profiles = tuple(profiles)
+    profiles_cache = (snapshot, profiles)
+    return profiles
+
+
+def load_profile(name):
+    for profile in load_profiles():
+        if profile["name"] == name:
+            return profile
+    return None
+
+
+# each account keeps its own place in its own journal
+def checkpoint_file(name):
+    if name == "main":
+        return CHECKPOINT_FILE
+    root, ext = os.path.splitext(CHECKPOINT_FILE)
+    return f"{root}-{name}{ext}"
+
+
+# Save settings function, also swaps in the new snapshot so nothing has to re-read it
+def save_config(config):
+    with config_lock:
+        with open(CONFIG_FILE, "w") as savefile:
+            json.dump(config, savefile, indent=4)
+        set_config_snapshot(config, config_file_stamp())
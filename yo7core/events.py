@@ -0,0 +1,64 @@
+import sys
+import queue
+
+
+# where core errors end up, the gui swaps in its own handler and headless runs print them
+def print_error(e):
+    print(f"Yo7 error: {e}", file=sys.stderr)
+
+
+error_handler = print_error
+
+
+def set_error_handler(handler):
+    global error_handler
+    error_handler = handler or print_error
+
+
+def report_error(e):
+    error_handler(e)
+
+
+# hand over from the core threads to the window. tk may only be touched from its own thread,
+# so anything can post here without waiting and the window picks events up on a timer.
+# errors and the like go in a bounded queue that forgets the oldest when full, the scanner and
+# shutdown events the window waits on have their own queue and are never dropped
+CONTROL_EVENTS = ("started", "stopped", "closed")
+ui_events = queue.Queue(maxsize=1000)
+control_events = queue.Queue()
+
+
+def post_event(kind, data=None):
+    if kind in CONTROL_EVENTS:
+        control_events.put_nowait((kind, data))
+        return
+    while True:
+        try:
+            ui_events.put_nowait((kind, data))
+            return
+        except queue.Full:
+            pass
+        try:
+            ui_events.get_nowait()
+        except queue.Empty:
+            pass
+
+
+def post_error(e):
+    post_event("error", str(e))
+
+
+def drain_events(limit=200):
+    events = []
+    while len(events) < limit:
+        try:
+            events.append(ui_events.get_nowait())
+        except queue.Empty:
+            break
+    # control events last, so errors from a failed start show before the button comes back
+    while True:
+        try:
+            events.append(control_events.get_nowait())
+        except queue.Empty:
+            break
+    return events
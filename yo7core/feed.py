@@ -0,0 +1,31 @@
+import threading
+from collections import deque
+
+
+# the last few hundred chat messages for the live feed in the window. a fixed size ring buffer,
+# so a long session under heavy chat never grows it. version goes up with every message,
+# which lets the window skip redrawing when nothing came in since its last look
+class ChatFeed:
+    def __init__(self, size=500):
+        self.lines = deque(maxlen=size)
+        self.version = 0
+        self.lock = threading.Lock()
+
+    # npc and system ($) messages are only noise in the feed
+    def add(self, record):
+        if record["from"].startswith("$") or record["message"].startswith("$"):
+            return
+        line = (record["timestamp"], record.get("channel_name", "Unknown"), record["from"], record["message"],
+                record.get("account", "main"))
+        with self.lock:
+            self.lines.append(line)
+            self.version += 1
+
+    def snapshot(self):
+        with self.lock:
+            return self.version, list(self.lines)
+
+    def clear(self):
+        with self.lock:
+            self.lines.clear()
+            self.version += 1
@@ -0,0 +1,242 @@
+import os
+import re
+import json
+import calendar
+from datetime import timezone
+
+# orjson is a good bit quicker if its installed, the standard library is fine otherwise
+try:
+    from orjson import loads
+except ImportError:
+    from json import loads
+
+
+# journal channel names to the labels used in settings and notifications
+CHANNEL_NAMES = {"player": "DM", "starsystem": "SYSTEM", "local": "LOCAL",
+                 "wing": "WING", "voicechat": "VC", "squadron": "SQUAD"}
+
+CHAT_EVENTS = ("ReceiveText", "Receivetext")
+CHAT_MARKERS = (b'"ReceiveText"', b'"Receivetext"')
+TIMESTAMP_PREFIX = b'{ "timestamp":"'
+TIMESTAMP_END = len(TIMESTAMP_PREFIX) + 20
+
+
+# journal timestamps are second precision utc strings, in this form they compare correctly as plain bytes
+def journal_timestamp(moment):
+    return moment.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ").encode()
+
+
+# seconds since the epoch for a journal timestamp string
+def timestamp_epoch(timestamp):
+    try:
+        return calendar.timegm((int(timestamp[0:4]), int(timestamp[5:7]), int(timestamp[8:10]),
+                                int(timestamp[11:13]), int(timestamp[14:16]), int(timestamp[17:19])))
+    except (ValueError, TypeError):
+        return None
+
+
+# timestamp of a raw journal line straight from its bytes, without decoding the rest
+def line_timestamp(line):
+    if line.startswith(TIMESTAMP_PREFIX):
+        return line[len(TIMESTAMP_PREFIX):TIMESTAMP_END]
+    return None
+
+
+# a hand edited or damaged journal can hold null or numbers where the game writes text
+def text_field(log, key):
+    value = log.get(key)
+    if value is None:
+        return "Unknown"
+    return value if isinstance(value, str) else str(value)
+
+
+# turns one raw journal line into a chat record, or None for anything that isnt a chat message at or after since
+def parse_chat_line(line, since=None):
+    # most journal lines are not chat, so reject them before any decoding happens
+    if CHAT_MARKERS[0] not in line and CHAT_MARKERS[1] not in line:
+        return None
+    # the game always writes the timestamp first, old lines can be skipped straight from the bytes
+    if since and line.startswith(TIMESTAMP_PREFIX) and line[len(TIMESTAMP_PREFIX):TIMESTAMP_END] < since:
+        return None
+    try:
+        log = loads(line)
+    except ValueError:
+        return None
+    if not isinstance(log, dict) or log.get("event") not in CHAT_EVENTS:
+        return None
+    timestamp = log.get("timestamp")
+    if not timestamp or not isinstance(timestamp, str) or (since and timestamp.encode() < since):
+        return None
+    return {"timestamp": timestamp,
+            "channel": text_field(log, "Channel"),
+            "from": text_field(log, "From"),
+            "message": text_field(log, "Message")}
+
+JOURNAL_NAME = re.compile(r'(?i)journal\.(?:(\d{4}-\d{2}-\d{2}T\d{6})|(\d{12}))\.(\d{2})\.log')
+
+
+# sort key for a journal file name, newer journals and later parts sort higher, None for any other file
+def journal_key(name):
+    if name[:8].lower() != "journal.":
+        return None
+    match = JOURNAL_NAME.fullmatch(name)
+    if not match:
+        return None
+    stamp = match.group(1)
+    if stamp is None:
+        # journals from before 2021 were named Journal.yymmddhhmmss.01.log
+        old = match.group(2)
+        stamp = f"20{old[0:2]}-{old[2:4]}-{old[4:6]}T{old[6:12]}"
+    return (stamp, int(match.group(3)))
+
+
+# every journal in the folder, built once and then kept up to date from file events
+class JournalIndex:
+    def __init__(self, folder):
+        self.folder = folder
+        self.folder_key = os.path.normcase(os.path.abspath(folder))
+        self.journals = {}
+        self.latest = None
+
+    def build(self):
+        self.journals.clear()
+        self.latest = None
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                key = journal_key(entry.name)
+                if key is not None:
+                    self.journals[entry.name] = key
+        if self.journals:
+            self.latest = max(self.journals, key=self.journals.get)
+        return self
+
+    def name_in_folder(self, path):
+        folder, name = os.path.split(path)
+        if os.path.normcase(os.path.abspath(folder)) != self.folder_key:
+            return None
+        return name
+
+    # returns True when the new file takes over as the latest journal
+    def add(self, path):
+        name = self.name_in_folder(path)
+        key = journal_key(name) if name else None
+        if key is None:
+            return False
+        self.journals[name] = key
+        if self.latest is None or key > self.journals[self.latest]:
+            self.latest = name
+            return True
+        return False
+
+    # returns True when the latest journal was the one that went away
+    def remove(self, path):
+        name = self.name_in_folder(path)
+        if not name or self.journals.pop(name, None) is None:
+            return False
+        if name != self.latest:
+            return False
+        self.latest = max(self.journals, key=self.journals.get) if self.journals else None
+        return True
+
+    def move(self, src_path, dest_path):
+        removed = self.remove(src_path)
+        added = self.add(dest_path)
+        return removed or added
+
+    def latest_path(self):
+        if self.latest is None:
+            return None
+        return os.path.join(self.folder, self.latest)
+
+
+# keeps the journal open and hands back only whole lines appended since the last read
+class JournalTailer:
+    def __init__(self):
+        self.path = None
+        self.handle = None
+        self.position = 0
+        self.pending = b""
+        # byte offset of the first line handed out by the last read_lines
+        self.lines_offset = 0
+
+    def open(self, path, position=0):
+        self.close()
+        self.path = path
+        self.handle = open(path, "rb")
+        self.handle.seek(position)
+        self.position = position
+
+    # skips everything already in the file, stopping short of a line that is still being written
+    def open_at_end(self, path):
+        self.open(path)
+        end = self.handle.seek(0, os.SEEK_END)
+        start = max(end - 65536, 0)
+        self.handle.seek(start)
+        last_newline = self.handle.read(end - start).rfind(b"\n")
+        self.position = start + last_newline + 1 if last_newline >= 0 else start
+        self.handle.seek(self.position)
+
+    def close(self):
+        if self.handle is not None:
+            self.handle.close()
+        self.handle = None
+        self.pending = b""
+
+    # byte offset just past the last complete line handed out
+    @property
+    def offset(self):
+        return self.position - len(self.pending)
+
+    def read_lines(self):
+        if self.handle is None:
+            return []
+        # file got shorter than what we have read, start over from the top
+        if os.fstat(self.handle.fileno()).st_size < self.position:
+            self.handle.seek(0)
+            self.position = 0
+            self.pending = b""
+        data = self.handle.read()
+        if not data:
+            return []
+        self.lines_offset = self.offset
+        self.position += len(data)
+        lines = (self.pending + data).split(b"\n")
+        # a half written line stays back until the game finishes it
+        self.pending = lines.pop()
+        return lines
+
+
+# what identifies a journal file between runs, its name plus the file id the os gives it
+def file_identity(path):
+    stat = os.stat(path)
+    return {"journal": os.path.basename(path), "inode": stat.st_ino}
+
+
+# where scanning got up to last time, or None if there is no usable checkpoint
+def load_checkpoint(path):
+    try:
+        with open(path, "r") as pullfile:
+            checkpoint = json.load(pullfile)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(checkpoint, dict) or not {"journal", "inode", "offset"} <= checkpoint.keys():
+        return None
+    return checkpoint
+
+
+def save_checkpoint(path, checkpoint):
+    temp = path + ".tmp"
+    with open(temp, "w") as savefile:
+        json.dump(checkpoint, savefile, indent=4)
+    os.replace(temp, path)
+
+
+# true when the checkpoint was taken on this exact journal and still fits inside it
+def checkpoint_matches(checkpoint, path):
+    try:
+        identity = file_identity(path)
+        size = os.path.getsize(path)
+    except OSError:
+        return False
+    return (checkpoint.get("journal") == identity["journal"] and checkpoint.get("inode") == identity["inode"]
+            and checkpoint.get("offset", 0) <= size)
@@ -0,0 +1,242 @@
+import os
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# latency buckets in seconds, fine at the bottom where the pipeline itself lives, coarse up top for network and humans
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def label_text(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = label_key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self.values.get(label_key(labels), 0)
+
+    def prometheus(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{label_text(key)} {value}")
+        return lines
+
+    def as_dict(self):
+        return {label_text(key) or "total": value for key, value in sorted(self.values.items())}
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = label_key(labels)
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+            index = 0
+            while index < len(self.buckets) and value > self.buckets[index]:
+                index += 1
+            series["counts"][index] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    # times a block of code into this histogram
+    def time(self, **labels):
+        return Timer(self, labels)
+
+    # rough quantile from the buckets, good enough to see where the time goes
+    def quantile(self, fraction, **labels):
+        series = self.series.get(label_key(labels))
+        if not series or not series["count"]:
+            return None
+        wanted = series["count"] * fraction
+        running = 0
+        for index, count in enumerate(series["counts"]):
+            running += count
+            if running >= wanted:
+                return self.buckets[index] if index < len(self.buckets) else float("inf")
+        return float("inf")
+
+    def prometheus(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for key, series in sorted(self.series.items()):
+            running = 0
+            for bound, count in zip(self.buckets, series["counts"]):
+                running += count
+                lines.append(f"{self.name}_bucket{label_text(key, [('le', bound)])} {running}")
+            lines.append(f"{self.name}_bucket{label_text(key, [('le', '+Inf')])} {series['count']}")
+            lines.append(f"{self.name}_sum{label_text(key)} {series['sum']}")
+            lines.append(f"{self.name}_count{label_text(key)} {series['count']}")
+        return lines
+
+    def as_dict(self):
+        summary = {}
+        for key, series in sorted(self.series.items()):
+            labels = dict(key)
+            summary[label_text(key) or "total"] = {"count": series["count"], "sum": series["sum"],
+                                                   "p50": self.quantile(0.5, **labels), "p99": self.quantile(0.99, **labels)}
+        return summary
+
+
+class Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+
+    def counter(self, name, help_text):
+        return self.metrics.setdefault(name, Counter(name, help_text))
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS):
+        return self.metrics.setdefault(name, Histogram(name, help_text, buckets))
+
+    def prometheus(self):
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.prometheus())
+        return "\n".join(lines) + "\n"
+
+    def as_dict(self):
+        return {name: metric.as_dict() for name, metric in self.metrics.items()}
+
+
+registry = Registry()
+
+lines_read = registry.counter("yo7_lines_read_total", "Journal lines read")
+journal_polls = registry.counter("yo7_journal_polls_total", "Rounds of journal polling, by whether anything changed")
+lines_parsed = registry.counter("yo7_lines_parsed_total", "Chat lines decoded from the journal")
+chat_matched = registry.counter("yo7_chat_matched_total", "Chat messages handed to the notifiers")
+chat_filtered = registry.counter("yo7_chat_filtered_total", "Chat messages dropped before notifying, by reason")
+notifications_sent = registry.counter("yo7_notifications_sent_total", "Notifications delivered, by sink")
+notifications_dropped = registry.counter("yo7_notifications_dropped_total", "Notifications dropped because a queue was full, by sink")
+notifications_failed = registry.counter("yo7_notifications_failed_total", "Notifications that failed to deliver, by sink")
+notifications_coalesced = registry.counter("yo7_notifications_coalesced_total", "Notifications folded into one that was still going, by sink")
+stage_seconds = registry.histogram("yo7_stage_seconds", "Time spent in each pipeline stage")
+sink_seconds = registry.histogram("yo7_sink_seconds", "Time from handing a message to a sink until it was delivered, by sink")
+event_seconds = registry.histogram("yo7_event_to_sink_seconds", "Time from the journal event timestamp until the sink finished, by sink")
+
+
+# journal timestamps are whole seconds, so this measure is only good to about a second
+def observe_event_age(event_time, sink):
+    if event_time is not None:
+        event_seconds.observe(max(time.time() - event_time, 0), sink=sink)
+
+
+# writes the metrics to a json or prometheus text file every few seconds
+class MetricsFileWriter:
+    def __init__(self, path, interval=5.0):
+        self.path = path
+        self.interval = interval
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="Yo7 metrics file", daemon=True)
+        self.thread.start()
+
+    def write(self):
+        text = json.dumps(registry.as_dict(), indent=4) if self.path.endswith(".json") else registry.prometheus()
+        temp = self.path + ".tmp"
+        with open(temp, "w") as savefile:
+            savefile.write(text)
+        os.replace(temp, self.path)
+
+    def run(self):
+        while not self.stopping.wait(self.interval):
+            try:
+                self.write()
+            except OSError:
+                pass
+
+    def stop(self):
+        self.stopping.set()
+        self.thread.join()
+        try:
+            self.write()
+        except OSError:
+            pass
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/metrics":
+            body, kind = registry.prometheus().encode(), "text/plain; version=0.0.4"
+        elif self.path == "/metrics.json":
+            body, kind = json.dumps(registry.as_dict()).encode(), "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", kind)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+# serves /metrics in prometheus format and /metrics.json on localhost only
+class MetricsServer:
+    def __init__(self, port):
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), MetricsHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever, name="Yo7 metrics server", daemon=True)
+        self.thread.start()
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+exporters = {}
+
+
+# starts the file writer and/or localhost endpoint once, asking again with the same settings is a no-op
+def export(metrics_file=None, metrics_port=None):
+    if metrics_file and exporters.get("file") is None:
+        exporters["file"] = MetricsFileWriter(metrics_file)
+    if metrics_port and exporters.get("server") is None:
+        exporters["server"] = MetricsServer(int(metrics_port))
+
+
+def stop_exporters():
+    for name in list(exporters):
+        exporters.pop(name).stop()
@@ -0,0 +1,99 @@
+import json
+import threading
+
+from yo7core.audio import AudioEngine
+from yo7core.events import report_error
+from yo7core.sinks import SINK_TYPES, DiscordSink, SoundSink
+from yo7core.webhook import DiscordSender
+
+
+# one audio engine and one webhook worker for the whole process
+audio = AudioEngine()
+discord = DiscordSender()
+
+# what the notification choice in the window stands for when the config has no "sinks" list
+NOTIF_TYPE_SINKS = {"simple sound alert": ({"type": "sound"},),
+                    "discord notification": ({"type": "discord"},),
+                    "sound and discord": ({"type": "sound"}, {"type": "discord"})}
+
+
+def sink_settings(config_pull):
+    sinks = config_pull.get("sinks")
+    if sinks is None:
+        sinks = NOTIF_TYPE_SINKS.get(config_pull.get("notif_type"), ())
+    return [settings for settings in sinks if settings.get("enabled", True)]
+
+
+def make_sink(settings):
+    kind = settings.get("type")
+    if kind == "sound":
+        return SoundSink(settings, audio)
+    if kind == "discord":
+        return DiscordSink(settings, discord)
+    if kind in SINK_TYPES:
+        return SINK_TYPES[kind](settings)
+    report_error(f"unknown notification sink {kind!r}")
+    return None
+
+
+# keeps the sinks for every account. the list is only rebuilt when that accounts config snapshot changes,
+# and a sink whose settings didnt change is kept running rather than started again
+class SinkRouter:
+    def __init__(self):
+        self.sinks = {}
+        self.routes = {}
+        self.lock = threading.Lock()
+
+    def sinks_for(self, config_pull):
+        account = config_pull.get("name", "main")
+        route = self.routes.get(account)
+        if route is not None and route[0] is config_pull:
+            return route[1]
+        with self.lock:
+            keys = []
+            for settings in sink_settings(config_pull):
+                key = json.dumps(settings, sort_keys=True)
+                if key not in self.sinks:
+                    self.sinks[key] = make_sink(settings)
+                if self.sinks[key] is not None:
+                    keys.append(key)
+            self.routes[account] = (config_pull, keys)
+            # new settings may have fixed whatever stopped the sound loading (a missing wav, the wrong device)
+            audio.retry()
+            # sinks no account uses any more are stopped
+            used = {key for _, account_keys in self.routes.values() for key in account_keys}
+            unused = [self.sinks.pop(key) for key in list(self.sinks) if key not in used]
+        # a slow sink can take a while to wind down, the journal reader shouldnt wait on it
+        for sink in unused:
+            if sink is not None:
+                threading.Thread(target=sink.stop, name="Yo7 sink stop", daemon=True).start()
+        return keys
+
+    # hands the message to every sink that wants it, each sink queues it and delivers on its own
+    def send(self, record, channel_name, config_pull):
+        for key in self.sinks_for(config_pull):
+            sink = self.sinks.get(key)
+            narrowed = sink.narrow(record, channel_name) if sink is not None else None
+            if narrowed is not None:
+                sink.offer(*narrowed, config_pull)
+
+    def stop(self):
+        with self.lock:
+            sinks, self.sinks, self.routes = self.sinks, {}, {}
+        for sink in sinks.values():
+            if sink is not None:
+                sink.stop()
+
+
+router = SinkRouter()
+
+
+# sends one matched chat message to every notification sink the settings ask for
+def notify(record, channel_name, config_pull):
+    router.send(record, channel_name, config_pull)
+
+
+def shutdown():
+    router.stop()
+    discord.stop()
+    audio.stop()
@@ -0,0 +1,98 @@
+import os
+import time
+import threading
+
+from yo7core import metrics
+
+BACKENDS = ("native", "polling", "hybrid")
+
+
+def stat_key(path):
+    try:
+        stat = os.stat(path)
+    except (OSError, TypeError):
+        return None
+    return (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+
+# the polling settings of one account, every one of them is optional
+def poll_settings(config_pull):
+    return {"min_interval": float(config_pull.get("poll_min_seconds", 0.25)),
+            "max_interval": float(config_pull.get("poll_max_seconds", 5)),
+            "quiet_seconds": float(config_pull.get("hybrid_quiet_seconds", 30)),
+            "hybrid": config_pull.get("watcher_backend") == "hybrid"}
+
+
+# for journal folders on network shares and synced folders, where watchdog events go missing.
+# each round is one os.stat of the active journal and one of the folder, however many old journals there are,
+# the folder is only listed again when its own stamp changes (or once a minute, in case the share hides that).
+# the interval drops to min_interval as soon as the journal moves and stretches back towards max_interval while
+# it stays quiet. in hybrid mode native events do the work, polling stays at max_interval while they keep
+# arriving and only tightens up once they have gone quiet for quiet_seconds
+class JournalPoller:
+    def __init__(self, watcher, min_interval=0.25, max_interval=5.0, quiet_seconds=30, hybrid=False, backoff=1.5,
+                 rescan_seconds=60):
+        self.watcher = watcher
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.quiet_seconds = quiet_seconds
+        self.hybrid = hybrid
+        self.backoff = backoff
+        self.rescan_seconds = rescan_seconds
+        self.interval = min_interval
+        self.watched = watcher.latest_log
+        self.journal_seen = stat_key(self.watched)
+        self.folder_seen = stat_key(watcher.folder)
+        self.rescanned = time.monotonic()
+        self.stopping = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="Yo7 journal poller", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def run(self):
+        while not self.stopping.wait(self.next_interval()):
+            self.poll()
+
+    def native_active(self):
+        seen = self.watcher.event_seen
+        return self.hybrid and seen is not None and time.monotonic() - seen < self.quiet_seconds
+
+    def next_interval(self):
+        if self.native_active():
+            return self.max_interval
+        return self.interval
+
+    # one round of checks, returns True when something changed
+    def poll(self):
+        changed = False
+        folder = stat_key(self.watcher.folder)
+        if folder != self.folder_seen or time.monotonic() - self.rescanned >= self.rescan_seconds:
+            self.folder_seen = folder
+            self.rescanned = time.monotonic()
+            changed = self.watcher.folder_changed()
+        watched = self.watcher.latest_log
+        journal = stat_key(watched)
+        if watched != self.watched:
+            # the reader moved on to another journal, whatever was written since it opened it still needs reading
+            self.watched = watched
+            self.watcher.journal_changed()
+            changed = True
+        elif journal != self.journal_seen:
+            self.watcher.journal_changed()
+            changed = True
+        self.journal_seen = journal
+        if changed:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.interval * self.backoff, self.max_interval)
+        metrics.journal_polls.inc(result="changed" if changed else "quiet")
+        return changed
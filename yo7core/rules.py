@@ -0,0 +1,170 @@
+import re
+
+from yo7core.events import report_error
+
+
+# builds one regex out of many words by sharing their common prefixes, so "o7", "o7o" and "omw"
+# become o(?:7o?|mw). the regex engine then walks the message once instead of trying every word in turn.
+# each entry is a literal start plus an optional regex tail that has to follow it
+def trie_pattern(entries):
+    trie = {}
+    for literal, tail in entries:
+        node = trie
+        for char in literal:
+            node = node.setdefault(char, {})
+        node.setdefault("", []).append(tail)
+    return node_pattern(trie)
+
+
+def node_pattern(node):
+    tails = node.get("", ())
+    ends = "" in tails
+    branches = [f"(?:{tail})" for tail in tails if tail]
+    singles = []
+    for char in sorted(key for key in node if key):
+        rest = node_pattern(node[char])
+        if rest:
+            branches.append(re.escape(char) + rest)
+        else:
+            singles.append(re.escape(char))
+    if len(singles) == 1:
+        branches.append(singles[0])
+    elif singles:
+        branches.append("[" + "".join(singles) + "]")
+    if not branches:
+        return ""
+    if len(branches) == 1 and not ends:
+        return branches[0]
+    return "(?:" + "|".join(branches) + ")" + ("?" if ends else "")
+
+
+# the plain letters a regex starts with, so regexes can share the keyword trie trick.
+# anything with an alternation or leading flags is left whole
+def literal_prefix(pattern):
+    if "|" in pattern or pattern.startswith("(?"):
+        return "", pattern
+    end = 0
+    while end < len(pattern) and (pattern[end].isalnum() or pattern[end] in " _"):
+        end += 1
+    # a quantifier belongs to the letter before it
+    if end and end < len(pattern) and pattern[end] in "?*+{":
+        end -= 1
+    return pattern[:end].lower(), pattern[end:]
+
+
+# inline flags, named groups, backreferences and conditionals only work where they start the whole regex or
+# refer to their own groups, so a pattern using any of them is never merged into the combined regex
+NOT_MERGEABLE = re.compile(r"\(\?[aiLmsux-]+\)|\(\?P[<=]|\(\?<[^=!]|\(\?\(|\\[1-9]")
+
+WORD = re.compile(r"\w+")
+
+
+# keywords match whole words, patterns are plain regexes, both ignore case. a message alerts when it is
+# from an allowed commander or matches any keyword or pattern, unless no allow rules are set at all.
+# blocked commanders never alert. single word keywords are looked up in a set against the words of the
+# message, so however many there are a message costs about the same. regexes that start with plain letters
+# share a trie that is matched against the lowercased message without IGNORECASE, which lets the regex engine
+# skip ahead to the letters they start with and rule out a branch on its first letter. only keywords with
+# spaces or punctuation and the regexes without a plain start go in the combined IGNORECASE regex
+class RuleSet:
+    def __init__(self, keywords=(), patterns=(), commanders=(), blocked=()):
+        self.commanders = frozenset(name.strip().casefold() for name in commanders if name.strip())
+        self.blocked = frozenset(name.strip().casefold() for name in blocked if name.strip())
+        parts = []
+        words = {word.strip().lower() for word in keywords if word.strip()}
+        self.words = frozenset(word for word in words if WORD.fullmatch(word))
+        phrases = words - self.words
+        if phrases:
+            parts.append(r"(?<!\w)" + trie_pattern((phrase, "") for phrase in phrases) + r"(?!\w)")
+        prefixed = []
+        merged = []
+        # patterns that cant share the combined regex are checked one by one after it
+        self.separate = []
+        for pattern in patterns:
+            try:
+                compiled = re.compile(pattern, re.IGNORECASE)
+            except re.error as e:
+                report_error(f"skipping filter pattern {pattern!r}: {e}")
+                continue
+            if NOT_MERGEABLE.search(pattern):
+                self.separate.append(compiled)
+                continue
+            merged.append(compiled)
+            literal, tail = literal_prefix(pattern)
+            if literal:
+                prefixed.append((literal, f"(?i:{tail})" if tail else ""))
+            else:
+                parts.append(f"(?:{pattern})")
+        try:
+            self.matcher = re.compile("|".join(parts), re.IGNORECASE) if parts else None
+            self.prefixed = re.compile(trie_pattern(prefixed)) if prefixed else None
+        except re.error as e:
+            # something slipped past the checks above, fall back to keywords plus one regex per pattern
+            report_error(f"filter patterns could not be combined, checking them one by one: {e}")
+            self.matcher = re.compile(parts[0], re.IGNORECASE) if phrases else None
+            self.prefixed = None
+            self.separate = merged + self.separate
+        self.filtering = bool(self.words or self.prefixed or self.matcher or self.separate or self.commanders)
+
+    # None when the message should alert, otherwise the reason it was filtered
+    def check(self, record):
+        sender = record["from"].casefold()
+        if sender in self.blocked:
+            return "blocked"
+        if not self.filtering or sender in self.commanders:
+            return None
+        message = record["message"]
+        lowered = message.lower()
+        if self.words and not self.words.isdisjoint(WORD.findall(lowered)):
+            return None
+        if self.prefixed is not None and self.prefixed.search(lowered):
+            return None
+        if self.matcher is not None and self.matcher.search(message):
+            return None
+        for pattern in self.separate:
+            if pattern.search(message):
+                return None
+        return "rules"
+
+
+# the window edits rules as comma separated text, anything written between slashes is a regex
+def split_rule_text(text):
+    keywords = []
+    patterns = []
+    for item in re.findall(r"\s*/(?:\\.|[^/\\])+/\s*(?=,|$)|[^,]+", text):
+        item = item.strip()
+        if len(item) > 2 and item.startswith("/") and item.endswith("/"):
+            pattern = item[1:-1]
+            # every rule already ignores case
+            if pattern.startswith("(?i)"):
+                pattern = pattern[4:]
+            if pattern:
+                patterns.append(pattern)
+        elif item:
+            keywords.append(item)
+    return keywords, patterns
+
+
+def rule_text(keywords=(), patterns=()):
+    return ", ".join(list(keywords) + [f"/{pattern}/" for pattern in patterns])
+
+
+# rules live under "rules" in the config, next to the channel switches
+def rules_from_config(config_pull):
+    rules = config_pull.get("rules") or {}
+    return RuleSet(rules.get("keywords", ()), rules.get("patterns", ()),
+                   rules.get("commanders", ()), rules.get("blocked", ()))
+
+
+# compiled rules for each account, only rebuilt when that accounts config snapshot changes
+rules_cache = {}
+
+
+def rules_for(config_pull):
+    account = config_pull.get("name", "main")
+    cached = rules_cache.get(account)
+    if cached is not None and cached[0] is config_pull:
+        return cached[1]
+    rules = rules_from_config(config_pull)
+    rules_cache[account] = (config_pull, rules)
+    return rules
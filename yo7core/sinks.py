@@ -0,0 +1,264 @@
+import json
+import time
+import queue
+import socket
+import threading
+
+from yo7core import metrics
+from yo7core.events import report_error
+from yo7core.journal import timestamp_epoch
+from yo7core.throttle import digest_record
+
+
+def message_line(channel_name, record):
+    return f"`{channel_name}`   {record['from']} :   {record['message']}"
+
+
+# a throttle digest lists every message it stands in for, one per line
+def message_content(record, channel_name):
+    if "digest" not in record:
+        return message_line(channel_name, record)
+    lines = [message_line(name, item) for name, item in record["digest"]]
+    if record.get("more"):
+        lines.append(f"...and {record['more']} more")
+    return "\n".join(lines)
+
+
+# somewhere a matched message can go. a sink only hears the channels listed in its settings, all of them if none are.
+# offer is called from the journal reader thread so it must never block
+class Sink:
+    kind = "sink"
+
+    def __init__(self, settings):
+        self.settings = settings
+        self.name = settings.get("name") or self.kind
+        channels = settings.get("channels")
+        self.channels = frozenset(channels) if channels else None
+
+    # the record and channel this sink should get, or None when it wants none of it. a digest is cut down
+    # to the messages on this sinks channels, the ones that didnt fit in it have no channel to go by so they are left out
+    def narrow(self, record, channel_name):
+        if self.channels is None:
+            return record, channel_name
+        if "digest" not in record:
+            return (record, channel_name) if channel_name in self.channels else None
+        items = [(name, item) for name, item in record["digest"] if name in self.channels]
+        if not items:
+            return None
+        if len(items) == len(record["digest"]) and not record.get("more"):
+            return record, channel_name
+        return digest_record(items)
+
+    def offer(self, record, channel_name, config_pull):
+        raise NotImplementedError
+
+    def stop(self):
+        pass
+
+
+# the sound and discord sinks hand straight over to the long lived workers in notify, which already queue and drop
+class SoundSink(Sink):
+    kind = "sound"
+
+    def __init__(self, settings, engine):
+        super().__init__(settings)
+        self.engine = engine
+
+    def offer(self, record, channel_name, config_pull):
+        volume = self.settings.get("volume", config_pull.get("volume", 100))
+        self.engine.play(round(float(volume)/100,1), timestamp_epoch(record["timestamp"]))
+
+
+class DiscordSink(Sink):
+    kind = "discord"
+
+    def __init__(self, settings, sender):
+        super().__init__(settings)
+        self.sender = sender
+
+    def offer(self, record, channel_name, config_pull):
+        payload = {"username": "Yo7", "content": message_content(record, channel_name)}
+        self.sender.send(self.settings.get("url") or config_pull.get("webhook_url"), payload,
+                         timestamp_epoch(record["timestamp"]))
+
+
+# a sink with its own bounded queue and worker thread. when the queue is full overflow decides
+# whether the new message ("drop_new") or the oldest waiting one ("drop_oldest") is thrown away
+class QueuedSink(Sink):
+    def __init__(self, settings):
+        super().__init__(settings)
+        self.timeout = float(settings.get("timeout", 5))
+        self.overflow = settings.get("overflow", "drop_new")
+        self.pending = queue.Queue(maxsize=int(settings.get("max_pending", 50)))
+        self.failing = False
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name=f"Yo7 {self.name}", daemon=True)
+                self.thread.start()
+
+    def offer(self, record, channel_name, config_pull):
+        self.start()
+        item = (record, channel_name, config_pull, time.perf_counter())
+        while True:
+            try:
+                self.pending.put_nowait(item)
+                return
+            except queue.Full:
+                metrics.notifications_dropped.inc(sink=self.name)
+                if self.overflow != "drop_oldest":
+                    return
+            try:
+                oldest = self.pending.get_nowait()
+                self.pending.task_done()
+            except queue.Empty:
+                continue
+            if oldest is None:
+                # the sink is stopping, leave the stop marker where it was
+                self.pending.put_nowait(oldest)
+                return
+
+    # never waits on a full queue, whatever a stuck sink still has waiting is dropped.
+    # the worker closes its own file, socket or session once it has finished with them
+    def stop(self):
+        with self.lock:
+            thread, self.thread = self.thread, None
+        if thread is None:
+            self.close()
+            return
+        while True:
+            try:
+                self.pending.put_nowait(None)
+                break
+            except queue.Full:
+                pass
+            try:
+                self.pending.get_nowait()
+                self.pending.task_done()
+                metrics.notifications_dropped.inc(sink=self.name)
+            except queue.Empty:
+                pass
+        thread.join(timeout=self.timeout)
+
+    def run(self):
+        while True:
+            item = self.pending.get()
+            if item is None:
+                self.pending.task_done()
+                break
+            record, channel_name, config_pull, queued_at = item
+            try:
+                self.deliver(record, channel_name, config_pull)
+            except Exception as e:
+                metrics.notifications_failed.inc(sink=self.name)
+                # only the first failure in a row is reported, a dead sink shouldnt bury the user in errors
+                if not self.failing:
+                    self.failing = True
+                    report_error(f"{self.name} notification failed: {e}")
+            else:
+                self.failing = False
+                metrics.notifications_sent.inc(sink=self.name)
+                metrics.sink_seconds.observe(time.perf_counter() - queued_at, sink=self.name)
+                metrics.observe_event_age(timestamp_epoch(record["timestamp"]), self.name)
+            finally:
+                self.pending.task_done()
+        self.close()
+
+    def deliver(self, record, channel_name, config_pull):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+# what the generic sinks send, one flat json object per message
+def message_json(record, channel_name, config_pull):
+    return {"account": config_pull.get("name", "main"), "channel": channel_name, "timestamp": record["timestamp"],
+            "from": record["from"], "message": record["message"], "content": message_content(record, channel_name)}
+
+
+# posts the message as json to any url, for home automation and the like
+class WebhookSink(QueuedSink):
+    kind = "webhook"
+
+    def __init__(self, settings):
+        super().__init__(settings)
+        self.session = None
+
+    def deliver(self, record, channel_name, config_pull):
+        if self.session is None:
+            import requests
+            self.session = requests.Session()
+        response = self.session.post(self.settings["url"], json=message_json(record, channel_name, config_pull),
+                                     headers=self.settings.get("headers"), timeout=self.timeout)
+        response.raise_for_status()
+
+    def close(self):
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+
+
+# appends one json line per message to a file
+class FileSink(QueuedSink):
+    kind = "file"
+
+    def __init__(self, settings):
+        super().__init__(settings)
+        self.file = None
+
+    def deliver(self, record, channel_name, config_pull):
+        if self.file is None:
+            self.file = open(self.settings["path"], "a", encoding="utf-8")
+        self.file.write(json.dumps(message_json(record, channel_name, config_pull)) + "\n")
+        self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+# writes one json line per message to a local tcp socket, reconnecting whenever the other end went away
+class SocketSink(QueuedSink):
+    kind = "socket"
+
+    def __init__(self, settings):
+        super().__init__(settings)
+        self.connection = None
+
+    def deliver(self, record, channel_name, config_pull):
+        data = (json.dumps(message_json(record, channel_name, config_pull)) + "\n").encode()
+        if self.connection is None:
+            address = (self.settings.get("host", "127.0.0.1"), int(self.settings["port"]))
+            self.connection = socket.create_connection(address, timeout=self.timeout)
+        try:
+            self.connection.sendall(data)
+        except OSError:
+            self.close()
+            raise
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+# a desktop toast through plyer, which is only needed when this sink is switched on
+class DesktopSink(QueuedSink):
+    kind = "desktop"
+
+    def deliver(self, record, channel_name, config_pull):
+        from plyer import notification
+        if "digest" in record:
+            title = f"Yo7 - {record['from']}"
+        else:
+            title = f"Yo7 - {channel_name} - {record['from']}"
+        notification.notify(title=title, message=message_content(record, channel_name)[:256], app_name="Yo7",
+                            timeout=int(self.settings.get("display_seconds", 5)))
+
+
+SINK_TYPES = {sink.kind: sink for sink in (WebhookSink, FileSink, SocketSink, DesktopSink)}
@@ -0,0 +1,198 @@
+import time
+import threading
+from collections import OrderedDict
+
+from yo7core import metrics
+
+
+# classic token bucket, rate is tokens per second and burst is how many can be saved up
+class TokenBucket:
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+# dict that forgets the least recently used keys once it holds max_keys, keeps memory flat under spam
+class BoundedCache(OrderedDict):
+    def __init__(self, max_keys):
+        super().__init__()
+        self.max_keys = max_keys
+
+    def touch(self, key, make):
+        value = self.get(key)
+        if value is None:
+            value = make()
+            self[key] = value
+            if len(self) > self.max_keys:
+                self.popitem(last=False)
+        else:
+            self.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self[key] = value
+        self.move_to_end(key)
+        if len(self) > self.max_keys:
+            self.popitem(last=False)
+
+
+# settings live under "throttle" in the config, every one of them is optional
+def throttle_settings(config_pull):
+    settings = config_pull.get("throttle") or {}
+    return (float(settings.get("channel_per_minute", 0)), float(settings.get("channel_burst", 5)),
+            float(settings.get("commander_per_minute", 0)), float(settings.get("commander_burst", 3)),
+            float(settings.get("coalesce_seconds", 0)), float(settings.get("duplicate_seconds", 0)))
+
+
+# sits between matching and notifying. drops repeats of the same message, limits how often one channel
+# or one commander can set off an alert, and folds bursts into a single digest. the first message after
+# a quiet spell always goes out straight away, anything else inside the coalescing window waits for the digest.
+# time only comes from the clock passed in, so a fake clock makes it fully deterministic
+class Throttle:
+    def __init__(self, clock=time.monotonic, max_keys=1000, max_digest=20):
+        self.clock = clock
+        self.max_digest = max_digest
+        self.buckets = BoundedCache(max_keys)
+        self.recent = BoundedCache(max_keys)
+        self.windows = {}
+
+    # returns the notifications to send right now, each as (record, channel_name, config)
+    def offer(self, record, channel_name, config_pull):
+        now = self.clock()
+        channel_rate, channel_burst, commander_rate, commander_burst, coalesce, duplicate = throttle_settings(config_pull)
+        account = config_pull.get("name", "main")
+        if duplicate > 0:
+            key = (account, record["from"], record["message"])
+            seen = self.recent.get(key)
+            self.recent.put(key, now)
+            if seen is not None and now - seen < duplicate:
+                metrics.chat_filtered.inc(reason="duplicate")
+                return []
+        if channel_rate > 0:
+            bucket = self.buckets.touch(("channel", account, channel_name),
+                                        lambda: TokenBucket(channel_rate / 60, channel_burst, now))
+            if not bucket.take(now):
+                metrics.chat_filtered.inc(reason="throttled")
+                return []
+        if commander_rate > 0:
+            bucket = self.buckets.touch(("commander", account, record["from"]),
+                                        lambda: TokenBucket(commander_rate / 60, commander_burst, now))
+            if not bucket.take(now):
+                metrics.chat_filtered.inc(reason="throttled")
+                return []
+        if coalesce <= 0:
+            return [(record, channel_name, config_pull)]
+        window = self.windows.get(account)
+        if window is None or now >= window["until"]:
+            # a window that closed before flush got to it still owes its digest
+            ready = [digest(window)] if window is not None and window["items"] else []
+            self.windows[account] = {"until": now + coalesce, "items": [], "more": 0, "config": config_pull}
+            return ready + [(record, channel_name, config_pull)]
+        if len(window["items"]) < self.max_digest:
+            window["items"].append((channel_name, record))
+        else:
+            window["more"] += 1
+        window["config"] = config_pull
+        metrics.chat_filtered.inc(reason="coalesced")
+        return []
+
+    # digests whose window has closed, each window that produced one stays open for another round
+    def flush(self, force=False):
+        now = self.clock()
+        ready = []
+        for account, window in list(self.windows.items()):
+            if not force and now < window["until"]:
+                continue
+            if not window["items"]:
+                del self.windows[account]
+                continue
+            ready.append(digest(window))
+            coalesce = throttle_settings(window["config"])[4]
+            self.windows[account] = {"until": now + coalesce, "items": [], "more": 0, "config": window["config"]}
+        return ready
+
+    # when the next window closes, so a timer knows how long it can sleep
+    def next_due(self):
+        return min((window["until"] for window in self.windows.values()), default=None)
+
+
+# one notification standing in for several messages
+def digest(window):
+    record, channel_name = digest_record(window["items"], window["more"])
+    return (record, channel_name, window["config"])
+
+
+# the record for a list of (channel_name, record) items plus more that didnt fit in it
+def digest_record(items, more=0):
+    channels = {channel_name for channel_name, record in items}
+    channel_name = channels.pop() if len(channels) == 1 else "DIGEST"
+    last = items[-1][1]
+    count = len(items) + more
+    record = {"timestamp": last["timestamp"], "channel": last["channel"], "from": f"{count} messages",
+              "message": "; ".join(f"{record['from']}: {record['message']}" for _, record in items),
+              "digest": items, "more": more}
+    return record, channel_name
+
+
+# wraps the notifier with a Throttle and a timer thread that sends out digests as their windows close
+class ThrottledNotifier:
+    def __init__(self, on_message, throttle=None):
+        self.on_message = on_message
+        self.throttle = throttle or Throttle()
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.stopping = False
+        self.thread = None
+
+    def __call__(self, record, channel_name, config_pull):
+        with self.lock:
+            ready = self.throttle.offer(record, channel_name, config_pull)
+            waiting = self.throttle.next_due() is not None
+        for item in ready:
+            self.on_message(*item)
+        if waiting:
+            self.start()
+            self.wake.set()
+
+    # every account's reader thread can get here at once, only one of them may start the timer
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                self.stopping = False
+                self.thread = threading.Thread(target=self.run, name="Yo7 throttle", daemon=True)
+                self.thread.start()
+
+    def run(self):
+        while not self.stopping:
+            with self.lock:
+                due = self.throttle.next_due()
+            timeout = None if due is None else max(due - self.throttle.clock(), 0)
+            self.wake.wait(timeout)
+            self.wake.clear()
+            self.send_ready()
+
+    def send_ready(self, force=False):
+        with self.lock:
+            ready = self.throttle.flush(force)
+        for item in ready:
+            self.on_message(*item)
+
+    # sends whatever is still waiting in a digest, then stops the timer
+    def stop(self):
+        with self.lock:
+            thread, self.thread = self.thread, None
+            self.stopping = True
+        if thread is not None:
+            self.wake.set()
+            thread.join()
+        self.send_ready(force=True)
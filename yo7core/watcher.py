@@ -0,0 +1,337 @@
+import os
+import time
+import cProfile
+import threading
+from datetime import datetime, timezone
+
+from yo7core import config, metrics
+from yo7core.config import load_config, load_profile, load_profiles
+from yo7core.events import report_error
+from yo7core.feed import ChatFeed
+from yo7core.journal import (CHANNEL_NAMES, JournalIndex, JournalTailer, checkpoint_matches, file_identity,
+                             journal_timestamp, line_timestamp, load_checkpoint, parse_chat_line, save_checkpoint)
+from yo7core.notify import notify
+from yo7core.poller import BACKENDS, JournalPoller, poll_settings
+from yo7core.rules import rules_for
+from yo7core.throttle import ThrottledNotifier
+
+CHECKPOINT_INTERVAL = 5.0
+
+
+# follows the newest journal in a folder and hands every wanted chat message to on_message,
+# using the settings of one account. watchdog only needs a dispatch method on the handler,
+# so watchdog itself isnt imported here
+class LogWatcher:
+    def __init__(self, folder, since=None, on_message=notify, checkpoint_file=None, profile_file=None, account="main",
+                 on_record=None):
+        self.account = account
+        self.config_pull = load_profile(account) or {}
+        self.folder = folder
+        self.on_message = on_message
+        # sees every chat record before any filtering, used by the live feed and the archive
+        self.on_record = on_record
+        # optional cProfile run around every pass over new lines, written out when the watcher stops
+        self.profile_file = profile_file
+        self.profiler = cProfile.Profile() if profile_file else None
+        self.woken_at = None
+        self.checkpoint_file = checkpoint_file or config.checkpoint_file(account)
+        self.tailer = JournalTailer()
+        self.latest_log = None
+        self.since = since
+        self.last_timestamp = None
+        self.checkpointed = 0
+        # journal list is read once here, after that it only changes through file events
+        self.index = JournalIndex(self.folder).build()
+        self.resume(self.index.latest_path())
+        # watchdog events only flag that there is work, a single reader thread does the reading
+        self.wake = threading.Event()
+        self.rescan = False
+        self.stopping = False
+        # when watchdog last told us anything, and the poller for folders it cant be trusted with
+        self.event_seen = None
+        self.poller = None
+        self.reader = threading.Thread(target=self.run, name="Yo7 journal reader", daemon=True)
+        self.reader.start()
+        self.wake.set()
+
+    def dispatch(self, event):
+        self.event_seen = time.monotonic()
+        handler = getattr(self, "on_" + event.event_type, None)
+        if handler is not None:
+            handler(event)
+
+    def on_modified(self, event):
+        if event.src_path == self.latest_log:
+            self.journal_changed()
+
+    def journal_changed(self):
+        if self.woken_at is None:
+            self.woken_at = time.perf_counter()
+        self.wake.set()
+
+    # the poller saw the folder change without any events, list it again.
+    # the new index is swapped in whole so the reader never sees it half built
+    def folder_changed(self):
+        try:
+            index = JournalIndex(self.folder).build()
+        except OSError:
+            return False
+        self.index = index
+        if index.latest_path() == self.latest_log:
+            return False
+        self.rescan = True
+        self.wake.set()
+        return True
+    
+    def on_created(self, event):
+        if not event.is_directory and self.index.add(event.src_path):
+            self.rescan = True
+            self.wake.set()
+
+    def on_deleted(self, event):
+        if not event.is_directory and self.index.remove(event.src_path):
+            self.rescan = True
+            self.wake.set()
+
+    def on_moved(self, event):
+        if not event.is_directory and self.index.move(event.src_path, event.dest_path):
+            self.rescan = True
+            self.wake.set()
+
+    def set_latest_log(self, log_file):
+        self.latest_log = log_file
+        if log_file and os.path.exists(log_file):
+            self.tailer.open(log_file)
+        else:
+            self.tailer.close()
+
+    # start from the end of the journal, or from the checkpoint when catching up on missed messages
+    def resume(self, log_file):
+        checkpoint = load_checkpoint(self.checkpoint_file)
+        if not log_file or not os.path.exists(log_file):
+            self.set_latest_log(log_file)
+        elif self.config_pull.get("catch_up") == "on" and checkpoint:
+            if checkpoint.get("timestamp"):
+                self.since = checkpoint["timestamp"].encode()
+            if checkpoint_matches(checkpoint, log_file):
+                self.latest_log = log_file
+                self.tailer.open(log_file, checkpoint["offset"])
+            else:
+                # the game started a new journal since, only lines after the checkpoint time count
+                self.set_latest_log(log_file)
+        else:
+            self.latest_log = log_file
+            self.tailer.open_at_end(log_file)
+
+    def save_checkpoint(self, force=False):
+        if not self.tailer.path or (not force and time.monotonic() - self.checkpointed < CHECKPOINT_INTERVAL):
+            return
+        self.checkpointed = time.monotonic()
+        try:
+            checkpoint = file_identity(self.tailer.path)
+            checkpoint["offset"] = self.tailer.offset
+            checkpoint["timestamp"] = self.last_timestamp.decode() if self.last_timestamp else None
+            save_checkpoint(self.checkpoint_file, checkpoint)
+        except OSError:
+            pass
+
+    def stop(self):
+        if self.poller is not None:
+            self.poller.stop()
+        self.stopping = True
+        self.wake.set()
+        self.reader.join()
+        self.save_checkpoint(force=True)
+        self.tailer.close()
+        if self.profiler is not None:
+            self.profiler.dump_stats(self.profile_file)
+
+    # a burst of modify events while we are busy collapses into one more pass
+    def run(self):
+        while True:
+            self.wake.wait()
+            if self.stopping:
+                break
+            self.wake.clear()
+            # how long the event sat waiting for the reader thread
+            woken_at, self.woken_at = self.woken_at, None
+            if woken_at is not None:
+                metrics.stage_seconds.observe(time.perf_counter() - woken_at, stage="wake")
+            # bad lines are dealt with one at a time, this is the last guard so nothing ends the only reader thread
+            try:
+                if self.rescan:
+                    self.rescan = False
+                    new_file = self.index.latest_path()
+                    if new_file != self.latest_log:
+                        self.profiled_pass()
+                        self.set_latest_log(new_file)
+                self.profiled_pass()
+            except Exception as e:
+                report_error(e)
+
+    def profiled_pass(self):
+        if self.profiler is None:
+            self.process_new_lines()
+            return
+        self.profiler.enable()
+        try:
+            self.process_new_lines()
+        finally:
+            self.profiler.disable()
+
+    def process_new_lines(self):
+        if not self.latest_log or self.stopping:
+            return
+        # one snapshot per batch of lines, the per-line path never touches config.json
+        with metrics.stage_seconds.time(stage="config"):
+            saved_status = load_profile(self.account)
+        if saved_status is None:
+            return
+        rules = rules_for(saved_status)
+        since = self.since
+        with metrics.stage_seconds.time(stage="read"):
+            lines = self.tailer.read_lines()
+        if not lines:
+            return
+        metrics.lines_read.inc(len(lines))
+        self.last_timestamp = line_timestamp(lines[-1]) or self.last_timestamp
+        journal = os.path.basename(self.latest_log)
+        offset = self.tailer.lines_offset
+        parse_started = time.perf_counter()
+        dispatching = 0
+        for line in lines:
+            line_offset = offset
+            offset += len(line) + 1
+            record = parse_chat_line(line, since)
+            if record is None:
+                continue
+            metrics.lines_parsed.inc()
+            # the tailer has already moved past these lines, so a message that trips up the rules or a sink
+            # is reported on its own and the rest of the batch still goes out
+            try:
+                dispatching += self.handle_record(record, journal, line_offset, saved_status, rules)
+            except Exception as e:
+                report_error(e)
+        metrics.stage_seconds.observe(time.perf_counter() - parse_started - dispatching, stage="parse")
+        self.save_checkpoint()
+
+    # filters one chat record and hands it on, returns the time spent handing it on
+    def handle_record(self, record, journal, line_offset, saved_status, rules):
+        channel_name = CHANNEL_NAMES.get(record["channel"], "Unknown")
+        if self.on_record is not None:
+            record.update(channel_name=channel_name, journal=journal, offset=line_offset, account=self.account)
+            self.on_record(record)
+        from_cmdr = record["from"]
+        message = record["message"]
+        if from_cmdr.startswith("$") or message.startswith("$"):
+            metrics.chat_filtered.inc(reason="npc")
+            return 0
+        status = saved_status.get(channel_name)
+        if status != "on":
+            metrics.chat_filtered.inc(reason="channel")
+            return 0
+        reason = rules.check(record)
+        if reason is not None:
+            metrics.chat_filtered.inc(reason=reason)
+            return 0
+        metrics.chat_matched.inc(account=self.account)
+        dispatch_started = time.perf_counter()
+        self.on_message(record, channel_name, saved_status)
+        dispatch_took = time.perf_counter() - dispatch_started
+        metrics.stage_seconds.observe(dispatch_took, stage="dispatch")
+        return dispatch_took
+
+
+# runs one watcher per account under a single observer, this is what both the window and the command line drive.
+# the notification workers behind on_message are shared by every account
+class Scanner:
+    def __init__(self, on_message=notify, profile_file=None):
+        # every account goes through the same throttle on its way to the notifiers
+        self.on_message = ThrottledNotifier(on_message)
+        self.profile_file = profile_file
+        self.observer = None
+        self.watchers = []
+        self.archive = None
+        # recent messages from every account for the window to show
+        self.feed = ChatFeed()
+        self.start_timestamp = None
+        # the window starts and stops from helper threads, this keeps the two from overlapping
+        self.lock = threading.RLock()
+
+    @property
+    def scanning(self):
+        return bool(self.watchers)
+
+    # folder overrides the journal folder of the main account and leaves the others out
+    # backend overrides the watcher_backend setting of every account
+    def start(self, folder=None, backend=None):
+        with self.lock:
+            self.start_watchers(folder, backend)
+
+    def start_watchers(self, folder, backend):
+        from watchdog.observers import Observer
+        self.stop()
+        profiles = load_profiles()
+        if folder:
+            profiles = profiles[:1]
+        config_pull = load_config() or {}
+        metrics.export(config_pull.get("metrics_file"), config_pull.get("metrics_port"))
+        self.start_timestamp = journal_timestamp(datetime.now(timezone.utc))
+        if config_pull.get("archive") == "on":
+            from yo7core.archive import ChatArchive
+            self.archive = ChatArchive(config_pull.get("archive_file", "chat.db"))
+        feed_size = int(config_pull.get("feed_size", 500))
+        if feed_size != self.feed.lines.maxlen:
+            self.feed = ChatFeed(feed_size)
+        observer = Observer()
+        for profile in profiles:
+            path = folder or profile.get("logfile_name")
+            if not path or not os.path.isdir(path):
+                report_error(f"You haven't set the log file location for {profile['name']}, \nor there is an issue with the log location")
+                continue
+            watcher = LogWatcher(path, since=self.start_timestamp, on_message=self.on_message, account=profile["name"],
+                                 profile_file=self.account_profile_file(profile),
+                                 on_record=self.record)
+            watcher_backend = backend or profile.get("watcher_backend", "native")
+            if watcher_backend not in BACKENDS:
+                report_error(f"unknown watcher backend {watcher_backend!r} for {profile['name']}, using native")
+                watcher_backend = "native"
+            if watcher_backend != "polling":
+                observer.schedule(watcher, path=path, recursive=False)
+            if watcher_backend != "native":
+                settings = poll_settings(profile)
+                settings["hybrid"] = watcher_backend == "hybrid"
+                watcher.poller = JournalPoller(watcher, **settings).start()
+            self.watchers.append(watcher)
+        if self.watchers:
+            self.observer = observer
+            self.observer.start()
+
+    def record(self, record):
+        self.feed.add(record)
+        if self.archive is not None:
+            self.archive.add(record)
+
+    def account_profile_file(self, profile):
+        profile_file = self.profile_file or profile.get("profile_file")
+        if not profile_file or profile["name"] == "main":
+            return profile_file
+        root, ext = os.path.splitext(profile_file)
+        return f"{root}-{profile['name']}{ext}"
+
+    def stop(self):
+        with self.lock:
+            self.stop_watchers()
+
+    def stop_watchers(self):
+        if self.observer:
+            self.observer.stop()
+            self.observer.join()
+            self.observer = None
+        for watcher in self.watchers:
+            watcher.stop()
+        self.watchers = []
+        self.on_message.stop()
+        if self.archive:
+            self.archive.close()
+            self.archive = None
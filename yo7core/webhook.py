@@ -0,0 +1,179 @@
+import time
+import queue
+import threading
+
+from yo7core import metrics
+from yo7core.events import report_error
+
+
+# background webhook poster, reuses pooled connections and follows discords rate limit headers.
+# a fixed number of worker lanes is shared by every webhook, each webhook always lands in the same lane
+# so its messages stay in order and its rate limit is only ever tracked by one thread
+class DiscordSender:
+    MAX_CONTENT = 2000
+
+    def __init__(self, max_pending=100, batch_window=0.1, max_retries=4, timeout=10, session=None, workers=2):
+        self.lanes = [queue.Queue(maxsize=max_pending) for _ in range(workers)]
+        self.batch_window = batch_window
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.session = session
+        self.on_error = report_error
+        self.reset_at = {}
+        self.sent = 0
+        self.dropped = 0
+        self.failed = 0
+        self.retried = 0
+        self.threads = []
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.threads:
+                return
+            # requests is only imported once something is actually sent
+            if self.session is None:
+                import requests
+                self.session = requests.Session()
+            for lane in self.lanes:
+                thread = threading.Thread(target=self.run, args=(lane,), name="Yo7 discord", daemon=True)
+                thread.start()
+                self.threads.append(thread)
+
+    def count(self, name, amount=1):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    # queue a message for the webhook, drops it if the queue is full rather than blocking the watcher
+    def send(self, webhook, payload, event_time=None):
+        self.start()
+        if len(payload["content"]) > self.MAX_CONTENT:
+            payload = dict(payload, content=payload["content"][:self.MAX_CONTENT - 3] + "...")
+        try:
+            self.lanes[hash(webhook) % len(self.lanes)].put_nowait((webhook, payload, time.perf_counter(), event_time))
+        except queue.Full:
+            self.count("dropped")
+            metrics.notifications_dropped.inc(sink="discord")
+
+    # blocks until everything queued so far has been delivered or given up on
+    def join(self):
+        for lane in self.lanes:
+            lane.join()
+
+    # never waits on a full lane, a webhook stuck retrying or rate limited loses whatever it still had waiting
+    def stop(self):
+        with self.lock:
+            threads, self.threads = self.threads, []
+        if not threads:
+            return
+        for lane in self.lanes:
+            while True:
+                try:
+                    lane.put_nowait(None)
+                    break
+                except queue.Full:
+                    pass
+                try:
+                    lane.get_nowait()
+                    lane.task_done()
+                    self.count("dropped")
+                    metrics.notifications_dropped.inc(sink="discord")
+                except queue.Empty:
+                    pass
+        for thread in threads:
+            thread.join(timeout=self.timeout)
+
+    def run(self, lane):
+        nothing = object()
+        held = nothing
+        while True:
+            item = held if held is not nothing else lane.get()
+            held = nothing
+            if item is None:
+                lane.task_done()
+                break
+            webhook, payload = item[0], item[1]
+            batch = [item]
+            size = len(payload["content"])
+            # pack whatever arrives close together for the same webhook into one post
+            deadline = time.monotonic() + self.batch_window
+            while True:
+                try:
+                    following = lane.get(timeout=max(deadline - time.monotonic(), 0.001))
+                except queue.Empty:
+                    break
+                if following is None or following[0] != webhook or size + 1 + len(following[1]["content"]) > self.MAX_CONTENT:
+                    held = following
+                    break
+                batch.append(following)
+                size += 1 + len(following[1]["content"])
+            content = "\n".join(queued[1]["content"] for queued in batch)
+            self.deliver(webhook, {"username": payload.get("username", "Yo7"), "content": content}, batch)
+            for _ in batch:
+                lane.task_done()
+
+    def deliver(self, webhook, payload, batch):
+        count = len(batch)
+        import requests
+        problem = None
+        for attempt in range(self.max_retries + 1):
+            wait = self.reset_at.get(webhook, 0) - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                response = self.session.post(webhook, json=payload, timeout=self.timeout)
+            except (requests.exceptions.MissingSchema, requests.exceptions.InvalidSchema,
+                    requests.exceptions.InvalidURL) as e:
+                # a malformed webhook url will never work, dont hold up the lane retrying it
+                problem = e
+                break
+            except requests.exceptions.RequestException as e:
+                problem = e
+                self.count("retried")
+                time.sleep(min(2 ** attempt, 30))
+                continue
+            self.read_limits(webhook, response)
+            if response.status_code == 429:
+                problem = requests.exceptions.HTTPError("429 Too Many Requests", response=response)
+                self.reset_at[webhook] = time.monotonic() + self.retry_after(response)
+                self.count("retried")
+                continue
+            if response.status_code >= 500:
+                problem = requests.exceptions.HTTPError(f"{response.status_code} Server Error", response=response)
+                self.count("retried")
+                time.sleep(min(2 ** attempt, 30))
+                continue
+            try:
+                response.raise_for_status()
+            except requests.exceptions.HTTPError as e:
+                problem = e
+                break
+            self.count("sent", count)
+            metrics.notifications_sent.inc(count, sink="discord")
+            for _, _, queued_at, event_time in batch:
+                metrics.sink_seconds.observe(time.perf_counter() - queued_at, sink="discord")
+                metrics.observe_event_age(event_time, "discord")
+            return
+        self.count("failed", count)
+        metrics.notifications_failed.inc(count, sink="discord")
+        if problem is not None and self.on_error:
+            self.on_error(problem)
+
+    # when the bucket is empty hold off until discord says it refills
+    def read_limits(self, webhook, response):
+        if response.headers.get("X-RateLimit-Remaining") == "0":
+            try:
+                reset_after = float(response.headers.get("X-RateLimit-Reset-After", 1))
+            except ValueError:
+                reset_after = 1
+            self.reset_at[webhook] = max(self.reset_at.get(webhook, 0), time.monotonic() + reset_after)
+
+    def retry_after(self, response):
+        try:
+            return float(response.headers["Retry-After"])
+        except (KeyError, ValueError):
+            pass
+        try:
+            return float(response.json().get("retry_after", 1))
+        except (ValueError, AttributeError):
+            return 1